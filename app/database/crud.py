@@ -1,39 +1,152 @@
 # crud.py
 
+from sqlalchemy import case, delete, func, insert, or_, update
 from sqlalchemy.future import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.models import User
-from datetime import datetime, timedelta
+from app.database.models import User, BroadcastJob, BroadcastDelivery, DailySignup, ChatCommandScope, MediaFile
+from app.database.user_cache import user_cache
+from datetime import date, datetime, timedelta
 
 # Вам не нужно изменять этот файл, так как он принимает сессию как параметр
 # и логика работы с сессией остается прежней.
 
-async def add_user(user_id: int, name: str, username: str, client_type: str, session: AsyncSession):
-    """Добавляет нового пользователя в базу данных."""
-    new_user = User(
-        id=user_id,
-        name=name,
-        username=username,
-        client_type=client_type,
-        date_joined=datetime.utcnow()
-    )
-    session.add(new_user)
-    await session.commit()
+def upsert_statement(session: AsyncSession, model, values, update_columns=(), increment_columns=(),
+                     conflict_columns=None):
+    """
+    Строит INSERT с обновлением при конфликте по первичному ключу (или `conflict_columns`).
 
+    MySQL — INSERT ... ON DUPLICATE KEY UPDATE, SQLite/PostgreSQL — ON CONFLICT.
+    Для других диалектов возвращает None (используется запасной вариант).
+    `values` — словарь или список словарей (многострочная вставка); при `values=None`
+    строки передаются в session.execute вторым аргументом (executemany).
+    `update_columns` при конфликте заменяются новыми значениями, к `increment_columns`
+    новое значение прибавляется (счётчики). `conflict_columns` — столбцы уникального индекса
+    для ON CONFLICT; в MySQL ON DUPLICATE KEY срабатывает по любому уникальному ключу.
+    """
+    dialect = session.bind.dialect.name
+    primary_key = [column.name for column in model.__table__.primary_key]
+    conflict_columns = list(conflict_columns or primary_key)
 
-async def user_is_registered(user_id: int, session: AsyncSession) -> bool:
-    """Проверяет, зарегистрирован ли пользователь в базе данных."""
-    result = await session.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none() is not None
+    if dialect == "mysql":
+        stmt = mysql_insert(model)
+        if values is not None:
+            stmt = stmt.values(values)
+        if update_columns or increment_columns:
+            assignments = {name: stmt.inserted[name] for name in update_columns}
+            assignments.update({name: getattr(model, name) + stmt.inserted[name] for name in increment_columns})
+            return stmt.on_duplicate_key_update(assignments)
+        # Пустое обновление: ключ присваивается сам себе
+        return stmt.on_duplicate_key_update({primary_key[0]: getattr(model, primary_key[0])})
 
+    if dialect in ("sqlite", "postgresql"):
+        insert_func = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert_func(model)
+        if values is not None:
+            stmt = stmt.values(values)
+        if update_columns or increment_columns:
+            assignments = {name: stmt.excluded[name] for name in update_columns}
+            assignments.update({name: getattr(model, name) + stmt.excluded[name] for name in increment_columns})
+            return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=assignments)
+        return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
 
-async def update_user_type(user_id: int, client_type: str, session: AsyncSession):
-    """Обновляет тип клиента в базе данных."""
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if user:
-        user.client_type = client_type
+    return None
+
+
+async def upsert_user(user_id: int, name: str, username: str, client_type: str, session: AsyncSession,
+                      update_type: bool = False):
+    """
+    Регистрирует пользователя или обновляет его имя и username одним upsert-запросом.
+
+    Новый пользователь в той же транзакции учитывается в сводке регистраций (+1).
+    Тип клиента меняется только при `update_type=True` и только если он действительно
+    отличается — отдельным UPDATE, который переносит пользователя в сводке.
+    Повторные и одновременные вызовы не приводят к ошибке дубликата и не искажают сводку.
+    """
+    date_joined = datetime.utcnow()
+    values = dict(id=user_id, name=name, username=username, client_type=client_type, date_joined=date_joined)
+    try:
+        inserted, current = await _upsert_user_row(values, session)
+        if inserted:
+            await _bump_daily_signup(date_joined.date(), client_type, 1, session)
+        elif update_type:
+            await _change_user_type(user_id, client_type, current, session)
         await session.commit()
+    finally:
+        user_cache.invalidate(user_id)
+
+
+async def _upsert_user_row(values: dict, session: AsyncSession):
+    """
+    Вставляет пользователя или обновляет имя и username; возвращает (вставлен ли, текущая запись).
+
+    Для MySQL — один INSERT ... ON DUPLICATE KEY UPDATE, для SQLite/PostgreSQL — upsert_statement
+    с RETURNING; текущая запись (client_type, date_joined) известна только во втором случае,
+    иначе — None. В любом случае запрос блокирует строку до конца транзакции.
+    """
+    if session.bind.dialect.name == "mysql":
+        # При FOUND_ROWS rowcount вставки и неизменённой строки совпадает (1), поэтому при конфликте
+        # id присваивается через LAST_INSERT_ID(id): lastrowid 0 — строка вставлена
+        stmt = mysql_insert(User).values(values)
+        stmt = stmt.on_duplicate_key_update(
+            name=stmt.inserted.name, username=stmt.inserted.username, id=func.last_insert_id(User.id)
+        )
+        result = await session.execute(stmt)
+        return result.lastrowid == 0, None
+
+    stmt = upsert_statement(session, User, values, ["name", "username"])
+    if stmt is None:
+        try:
+            async with session.begin_nested():
+                await session.execute(insert(User).values(values))
+            return True, None
+        except IntegrityError:
+            await session.execute(
+                update(User).where(User.id == values["id"]).values(name=values["name"], username=values["username"])
+            )
+            return False, None
+
+    # RETURNING возвращает строку после запроса: при конфликте в ней прежняя дата регистрации
+    result = await session.execute(stmt.returning(User.client_type, User.date_joined))
+    current = result.one()
+    return current.date_joined == values["date_joined"], current
+
+
+async def _change_user_type(user_id: int, client_type: str, current, session: AsyncSession):
+    """Меняет тип клиента и переносит пользователя в сводке регистраций; коммит — за вызывающим кодом."""
+    if current is None:
+        current = (await session.execute(
+            select(User.client_type, User.date_joined).where(User.id == user_id)
+        )).one()
+    if current.client_type == client_type:
+        return
+    # Строку уже заблокировал upsert, условие на прежний тип — страховка от рассинхронизации сводки
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id, User.client_type == current.client_type)
+        .values(client_type=client_type)
+    )
+    if result.rowcount != 1:
+        raise RuntimeError(f"Тип клиента пользователя {user_id} изменён параллельным запросом.")
+    day = current.date_joined.date()
+    await _bump_daily_signup(day, current.client_type, -1, session)
+    await _bump_daily_signup(day, client_type, 1, session)
+
+
+async def _upsert_fallback(session: AsyncSession, values: dict, update_columns):
+    """Запасной вариант для прочих СУБД: вставка, а при конфликте — обновление."""
+    try:
+        async with session.begin_nested():
+            await session.execute(insert(User).values(values))
+    except IntegrityError:
+        if update_columns:
+            await session.execute(
+                update(User).where(User.id == values["id"]).values({column: values[column] for column in update_columns})
+            )
+    await session.commit()
 
 
 async def get_user(user_id: int, session: AsyncSession):
@@ -42,29 +155,424 @@ async def get_user(user_id: int, session: AsyncSession):
     return result.scalar_one_or_none()
 
 
-async def get_subscriber_stats(period: str, session: AsyncSession):
-    """Возвращает количество подписчиков за указанный период."""
-    now = datetime.utcnow()
+async def count_users(session: AsyncSession) -> int:
+    """Возвращает число пользователей в базе."""
+    result = await session.execute(select(func.count()).select_from(User))
+    return result.scalar_one()
+
+
+# Колонки users при выгрузке и загрузке (users_transfer.py)
+USER_TRANSFER_COLUMNS = ("id", "name", "username", "client_type", "date_joined")
+
+
+async def stream_users(session: AsyncSession, batch_size: int = 1000):
+    """
+    Выдаёт всех пользователей по возрастанию ID пачками по `batch_size` строк.
+
+    Запрос читается через серверный курсор: в памяти находится только текущая пачка.
+    """
+    query = select(*(getattr(User, name) for name in USER_TRANSFER_COLUMNS)).order_by(User.id)
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def bulk_upsert_users(rows, session: AsyncSession, overwrite: bool = True) -> int:
+    """
+    Записывает пачку пользователей и коммитит её.
+
+    Строки передаются одним executemany через соединение сессии (минуя ORM, который
+    группирует строки по набору NULL-значений и компилирует оператор для каждой группы):
+    оператор компилируется один раз, драйвер MySQL объединяет строки в многострочный INSERT.
+    Существующие записи обновляются (`overwrite=True`) или остаются без изменений.
+    Возвращает число обработанных строк (не число записанных).
+    Сводку регистраций после загрузки пересчитывает вызывающий код.
+    """
+    update_columns = [name for name in USER_TRANSFER_COLUMNS if name != "id"] if overwrite else []
+    stmt = upsert_statement(session, User, None, update_columns)
+    if stmt is not None:
+        connection = await session.connection()
+        await connection.execute(stmt, rows)
+        await session.commit()
+    else:
+        for values in rows:
+            await _upsert_fallback(session, values, update_columns)
+    return len(rows)
+
+
+# Периоды статистики подписчиков в порядке меню админ-панели
+SUBSCRIBER_STATS_PERIODS = ("all", "today", "week", "month", "quarter", "half_year", "year")
+
+
+def get_period_start(period: str, now: datetime = None):
+    """Возвращает начало периода статистики (None для всего времени)."""
+    now = now or datetime.utcnow()
 
     if period == "today":
-        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
     elif period == "week":
-        start_date = now - timedelta(days=7)
+        return now - timedelta(days=7)
     elif period == "month":
-        start_date = now.replace(day=1)
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "quarter":
         start_month = (now.month - 1) // 3 * 3 + 1
-        start_date = now.replace(month=start_month, day=1)
+        return now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "half_year":
         start_month = (now.month - 1) // 6 * 6 + 1
-        start_date = now.replace(month=start_month, day=1)
+        return now.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "year":
-        start_date = now.replace(month=1, day=1)
+        return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "all":
-        result = await session.execute(select(User))
-        return len(result.scalars().all())
+        return None
     else:
         raise ValueError("Invalid period specified.")
 
-    result = await session.execute(select(User).where(User.date_joined >= start_date))
-    return len(result.scalars().all())
+
+async def _bump_daily_signup(day: date, client_type: str, delta: int, session: AsyncSession):
+    """
+    Изменяет счётчик сводки регистраций за день; коммит выполняет вызывающий код.
+
+    Прибавление выполняется одним INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT), поэтому
+    одновременные первые регистрации дня и фоновый пересчёт не конфликтуют по ключу.
+    Уменьшение затрагивает только существующую строку.
+    """
+    if delta > 0:
+        stmt = upsert_statement(
+            session, DailySignup, dict(date=day, client_type=client_type, count=delta), increment_columns=["count"]
+        )
+        if stmt is not None:
+            await session.execute(stmt)
+            return
+    result = await session.execute(
+        update(DailySignup)
+        .where(DailySignup.date == day, DailySignup.client_type == client_type)
+        .values(count=DailySignup.count + delta)
+    )
+    if result.rowcount == 0 and delta > 0:
+        await session.execute(insert(DailySignup).values(date=day, client_type=client_type, count=delta))
+
+
+async def rebuild_daily_signups(session: AsyncSession, since: date = None):
+    """
+    Пересчитывает сводку регистраций по таблице users.
+
+    Без `since` пересчитывается вся сводка (backfill), иначе — только дни начиная с `since`.
+    """
+    delete_query = delete(DailySignup)
+    source = select(func.date(User.date_joined), User.client_type, func.count())
+    if since is not None:
+        delete_query = delete_query.where(DailySignup.date >= since)
+        source = source.where(User.date_joined >= datetime.combine(since, datetime.min.time()))
+    source = source.group_by(func.date(User.date_joined), User.client_type)
+
+    await session.execute(delete_query)
+    await session.execute(
+        insert(DailySignup).from_select(["date", "client_type", "count"], source)
+    )
+    await session.commit()
+
+
+async def get_signup_breakdown(session: AsyncSession):
+    """
+    Возвращает регистрации за все периоды меню с разбивкой по типам клиентов:
+    {период: {тип клиента: количество}}.
+
+    Завершённые дни берутся из сводки daily_signups, текущий день считается по users
+    через индекс date_joined. Периоды округляются до целых дней.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    breakdown = {period: {} for period in SUBSCRIBER_STATS_PERIODS}
+
+    columns = []
+    for period in SUBSCRIBER_STATS_PERIODS:
+        start_date = get_period_start(period, now)
+        if start_date is None:
+            columns.append(func.sum(DailySignup.count).label(period))
+        else:
+            columns.append(
+                func.sum(case((DailySignup.date >= start_date.date(), DailySignup.count), else_=0)).label(period)
+            )
+    result = await session.execute(
+        select(DailySignup.client_type, *columns)
+        .where(DailySignup.date < today)
+        .group_by(DailySignup.client_type)
+    )
+    for row in result.all():
+        for period in SUBSCRIBER_STATS_PERIODS:
+            breakdown[period][row.client_type] = int(row._mapping[period] or 0)
+
+    result = await session.execute(
+        select(User.client_type, func.count())
+        .where(User.date_joined >= datetime.combine(today, datetime.min.time()))
+        .group_by(User.client_type)
+    )
+    for client_type, count in result.all():
+        for period in SUBSCRIBER_STATS_PERIODS:
+            breakdown[period][client_type] = breakdown[period].get(client_type, 0) + count
+
+    return breakdown
+
+
+async def create_broadcast_job(client_type: str, from_chat_id: int, message_id: int, created_by: int,
+                               session: AsyncSession) -> BroadcastJob:
+    """Создаёт задание на рассылку."""
+    job = BroadcastJob(
+        client_type=client_type,
+        from_chat_id=from_chat_id,
+        message_id=message_id,
+        created_by=created_by,
+        status="running",
+    )
+    session.add(job)
+    await session.commit()
+    return job
+
+
+async def get_broadcast_job(job_id: int, session: AsyncSession):
+    """Получает задание на рассылку по ID."""
+    return await session.get(BroadcastJob, job_id)
+
+
+async def get_running_broadcast_job_ids(session: AsyncSession, unowned_at: datetime = None):
+    """
+    Возвращает ID незавершённых рассылок (для продолжения после перезапуска).
+
+    С `unowned_at` — только свободные: без владельца или с истёкшей к этому моменту арендой.
+    """
+    query = select(BroadcastJob.id).where(BroadcastJob.status == "running")
+    if unowned_at is not None:
+        query = query.where(or_(BroadcastJob.owner.is_(None), BroadcastJob.lease_until < unowned_at))
+    result = await session.execute(query.order_by(BroadcastJob.id))
+    return result.scalars().all()
+
+
+async def claim_broadcast_job(job_id: int, owner: str, lease_seconds: float, session: AsyncSession) -> bool:
+    """
+    Закрепляет незавершённую рассылку за экземпляром `owner` на `lease_seconds` секунд.
+
+    Проверка и захват выполняются одним UPDATE: из нескольких экземпляров рассылку получает
+    один. Удаётся, если рассылка свободна, её аренда истекла или уже принадлежит `owner`.
+    """
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(BroadcastJob)
+        .where(
+            BroadcastJob.id == job_id,
+            BroadcastJob.status == "running",
+            or_(BroadcastJob.owner.is_(None), BroadcastJob.owner == owner, BroadcastJob.lease_until < now),
+        )
+        .values(owner=owner, lease_until=now + timedelta(seconds=lease_seconds))
+    )
+    await session.commit()
+    return result.rowcount == 1
+
+
+async def renew_broadcast_lease(job_id: int, owner: str, lease_seconds: float, session: AsyncSession) -> bool:
+    """Продлевает аренду рассылки, если она ещё принадлежит `owner`; иначе возвращает False."""
+    result = await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id, BroadcastJob.status == "running", BroadcastJob.owner == owner)
+        .values(lease_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    )
+    await session.commit()
+    return result.rowcount == 1
+
+
+async def release_broadcast_job(job_id: int, owner: str, session: AsyncSession):
+    """Снимает аренду рассылки, если она принадлежит `owner` (рассылку сразу может подхватить другой экземпляр)."""
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+        .values(owner=None, lease_until=None)
+    )
+    await session.commit()
+
+
+async def checkpoint_broadcast_job(job_id: int, last_user_id: int, sent: int, failed: int, session: AsyncSession,
+                                   owner: str = None, lease_seconds: float = None, deliveries=()) -> bool:
+    """
+    Сохраняет курсор рассылки и прибавляет счётчики обработанной пачки.
+
+    `deliveries` — строки журнала доставки этой пачки: они пишутся в той же транзакции,
+    поэтому журнал всегда совпадает с курсором и счётчиками.
+    С `owner` заодно продлевает аренду на `lease_seconds` секунд; если аренда уже перешла
+    к другому экземпляру, ничего не меняет и возвращает False.
+    """
+    now = datetime.utcnow()
+    query = update(BroadcastJob).where(BroadcastJob.id == job_id)
+    values = dict(
+        last_user_id=last_user_id,
+        sent_count=BroadcastJob.sent_count + sent,
+        failed_count=BroadcastJob.failed_count + failed,
+        updated_at=now,
+    )
+    if owner is not None:
+        query = query.where(BroadcastJob.owner == owner)
+        values["lease_until"] = now + timedelta(seconds=lease_seconds)
+    result = await session.execute(query.values(**values))
+    if result.rowcount != 1:
+        await session.rollback()
+        return False
+    if deliveries:
+        await _upsert_broadcast_deliveries(deliveries, session)
+    await session.commit()
+    return True
+
+
+async def _upsert_broadcast_deliveries(rows, session: AsyncSession):
+    """
+    Записывает результаты доставки одной рассылки одним executemany (без коммита).
+
+    Пачка, повторно отправленная после сбоя, перезаписывает строки своих получателей.
+    """
+    stmt = upsert_statement(
+        session, BroadcastDelivery, None, ["status", "error", "created_at"], conflict_columns=["job_id", "user_id"]
+    )
+    if stmt is None:
+        await session.execute(
+            delete(BroadcastDelivery).where(
+                BroadcastDelivery.job_id == rows[0]["job_id"],
+                BroadcastDelivery.user_id.in_([row["user_id"] for row in rows]),
+            )
+        )
+        stmt = insert(BroadcastDelivery)
+    connection = await session.connection()
+    await connection.execute(stmt, rows)
+
+
+async def delete_old_broadcast_deliveries(before: datetime, session: AsyncSession) -> int:
+    """Удаляет журнал доставки рассылок, завершённых до `before`; одна рассылка — одна транзакция."""
+    result = await session.execute(
+        select(BroadcastJob.id).where(BroadcastJob.status != "running", BroadcastJob.updated_at < before)
+    )
+    deleted = 0
+    for job_id in result.scalars().all():
+        result = await session.execute(delete(BroadcastDelivery).where(BroadcastDelivery.job_id == job_id))
+        await session.commit()
+        deleted += result.rowcount
+    return deleted
+
+
+async def get_broadcast_delivery_summary(job_id: int, session: AsyncSession):
+    """Итоги доставки рассылки: список (статус, класс ошибки, количество)."""
+    result = await session.execute(
+        select(BroadcastDelivery.status, BroadcastDelivery.error, func.count())
+        .where(BroadcastDelivery.job_id == job_id)
+        .group_by(BroadcastDelivery.status, BroadcastDelivery.error)
+        .order_by(func.count().desc())
+    )
+    return result.all()
+
+
+async def get_failed_deliveries(job_id: int, limit: int, session: AsyncSession):
+    """Последние неудачные доставки рассылки: список (user_id, класс ошибки, время)."""
+    result = await session.execute(
+        select(BroadcastDelivery.user_id, BroadcastDelivery.error, BroadcastDelivery.created_at)
+        .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.status == "failed")
+        .order_by(BroadcastDelivery.id.desc())
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def get_latest_broadcast_job(session: AsyncSession):
+    """Последнее созданное задание на рассылку."""
+    result = await session.execute(select(BroadcastJob).order_by(BroadcastJob.id.desc()).limit(1))
+    return result.scalar_one_or_none()
+
+
+async def set_broadcast_job_status(job_id: int, status: str, session: AsyncSession):
+    """Меняет статус задания на рассылку; завершённое задание освобождается от аренды."""
+    await session.execute(
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id)
+        .values(status=status, owner=None, lease_until=None, updated_at=datetime.utcnow())
+    )
+    await session.commit()
+
+
+async def get_recipient_batch(client_type: str, after_id: int, limit: int, session: AsyncSession):
+    """Возвращает следующую пачку получателей (id, username) с ID больше `after_id`."""
+    result = await session.execute(
+        select(User.id, User.username)
+        .where(User.client_type == client_type, User.id > after_id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+def _recipient_filter(client_type: str, staff_ids=(), staff_usernames=()):
+    """Условие выборки получателей рассылки без сотрудников."""
+    conditions = [User.client_type == client_type]
+    if staff_ids:
+        conditions.append(User.id.notin_(staff_ids))
+    if staff_usernames:
+        names = [name.lstrip("@").lower() for name in staff_usernames]
+        conditions.append(or_(User.username.is_(None), func.lower(User.username).notin_(names)))
+    return conditions
+
+
+async def count_recipients(client_type: str, session: AsyncSession, staff_ids=(), staff_usernames=()) -> int:
+    """Считает получателей рассылки в базе (COUNT без загрузки строк)."""
+    result = await session.execute(
+        select(func.count()).select_from(User).where(*_recipient_filter(client_type, staff_ids, staff_usernames))
+    )
+    return result.scalar_one()
+
+
+async def iter_recipient_batches(client_type: str, batch_size: int, session: AsyncSession, after_id: int = 0):
+    """
+    Перебирает получателей пачками по `batch_size` с постраничным проходом по ID.
+
+    В памяти одновременно находится только одна пачка кортежей (id, username). Читающая
+    транзакция завершается сразу: соединение не занято, пока пачка отправляется.
+    """
+    while True:
+        batch = await get_recipient_batch(client_type, after_id, batch_size, session)
+        await session.commit()
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1][0]
+
+
+async def get_command_scope_role(chat_id: int, session: AsyncSession):
+    """Возвращает сохранённую роль набора команд чата или None."""
+    result = await session.execute(select(ChatCommandScope.role).where(ChatCommandScope.chat_id == chat_id))
+    return result.scalar_one_or_none()
+
+
+async def set_command_scope_role(chat_id: int, role, session: AsyncSession):
+    """Сохраняет роль набора команд чата."""
+    values = dict(chat_id=chat_id, role=role, updated_at=datetime.utcnow())
+    stmt = upsert_statement(session, ChatCommandScope, values, ["role", "updated_at"])
+    if stmt is None:
+        await session.merge(ChatCommandScope(**values))
+    else:
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def get_media_file_id(content_hash: str, session: AsyncSession):
+    """Возвращает сохранённый file_id для файла с указанным хэшем содержимого."""
+    result = await session.execute(select(MediaFile.file_id).where(MediaFile.content_hash == content_hash))
+    return result.scalar_one_or_none()
+
+
+async def save_media_file_id(content_hash: str, file_path: str, file_id: str, session: AsyncSession):
+    """Сохраняет file_id загруженного файла (перезаписывает прежний)."""
+    values = dict(content_hash=content_hash, file_path=file_path, file_id=file_id, created_at=datetime.utcnow())
+    stmt = upsert_statement(session, MediaFile, values, ["file_path", "file_id", "created_at"])
+    if stmt is None:
+        await session.merge(MediaFile(**values))
+    else:
+        await session.execute(stmt)
+    await session.commit()
+
+
+async def delete_media_file_id(content_hash: str, session: AsyncSession):
+    """Удаляет сохранённый file_id (например, если Telegram его больше не принимает)."""
+    await session.execute(delete(MediaFile).where(MediaFile.content_hash == content_hash))
+    await session.commit()
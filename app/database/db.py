@@ -1,33 +1,193 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+import logging
+from typing import Any, Dict, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config import load_config
 
+logger = logging.getLogger(__name__)
+
 # Загрузка конфигурации
 config = load_config()
 
-# Настройка базы данных
-DATABASE_URL = config.DATABASE_URL
-
-# Создаем движок для работы с базой данных
-engine = create_async_engine(DATABASE_URL, echo=True)
-
 # Создаем базу данных с помощью ORM SQLAlchemy
 Base = declarative_base()
 
-# Создаем сессию для взаимодействия с базой данных
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+# Движок и фабрика сессий создаются при первом обращении (см. get_engine)
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, измеряющий время получения соединения.
+
+    Время включает ожидание свободного соединения и, при необходимости, установку нового.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquire_count = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.acquire_count += 1
+            self.acquire_time_total += elapsed
+            self.acquire_time_max = max(self.acquire_time_max, elapsed)
+
+
+def create_engine_from_config(url: str = None, **overrides) -> AsyncEngine:
+    """
+    Создаёт движок по настройкам DB_* из окружения.
+
+    Для серверных баз (MySQL и др.) задаются размер пула, переполнение, recycle,
+    pre-ping и таймаут ожидания. SQLite-файл открывается одним соединением в режиме WAL:
+    SQLite всё равно выполняет записи по одной, а несколько соединений процесса только
+    получали бы друг от друга «database is locked».
+    """
+    url = make_url(url or config.DATABASE_URL)
+    options: Dict[str, Any] = dict(echo=config.DB_ECHO)
+    sqlite_file = url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+    if sqlite_file:
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+        )
+    elif url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+        )
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    if sqlite_file:
+        event.listen(engine.sync_engine, "connect", _configure_sqlite)
+    return engine
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL: чтение не блокирует запись; busy_timeout — ожидание блокировки другого процесса (воркеры)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def get_engine() -> AsyncEngine:
+    """Возвращает движок, создавая его при первом вызове."""
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = create_engine_from_config()
+        # Создаем сессию для взаимодействия с базой данных
+        _session_factory = sessionmaker(
+            _engine, class_=AsyncSession, expire_on_commit=False
+        )
+    return _engine
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Состояние пула соединений: выданные соединения, переполнение и время получения."""
+    if _engine is None:
+        return {}
+    pool = _engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, InstrumentedAsyncPool):
+        stats.update(
+            acquire_count=pool.acquire_count,
+            acquire_time_avg_ms=round(pool.acquire_time_total / pool.acquire_count * 1000, 3) if pool.acquire_count else 0.0,
+            acquire_time_max_ms=round(pool.acquire_time_max * 1000, 3),
+            timeouts=pool.timeouts,
+        )
+    return stats
+
 
 # Функция для получения сессии
 async def get_async_session():
-    return async_session()
+    if _session_factory is None:
+        get_engine()
+    return _session_factory()
 
 # Создание таблиц в базе данных
 async def create_db_and_tables():
-    async with engine.begin() as conn:
+    # Таблицы попадают в метаданные только после импорта моделей
+    from app.database import models  # noqa: F401
+
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _add_missing_columns(sync_conn):
+    """
+    create_all не меняет уже существующие таблицы — добавляем недостающие столбцы.
+
+    Добавляются только столбцы, допускающие NULL: для остальных нужна ручная миграция.
+    """
+    inspector = inspect(sync_conn)
+    quote = sync_conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.exec_driver_sql(
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+            )
+            logger.info("В таблицу %s добавлен столбец %s.", table.name, column.name)
+
+
+def _create_missing_indexes(sync_conn):
+    """create_all не добавляет индексы в уже существующие таблицы — создаём недостающие."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def ping_db():
+    """Проверяет соединение с базой (и заодно открывает первое соединение пула)."""
+    async with get_engine().connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+
 
 # Закрытие соединения с базой данных
 async def close_db():
-    await engine.dispose()
+    global _engine, _session_factory
+    if _engine is None:
+        return
+    stats = get_pool_stats()
+    if stats:
+        logger.info("Пул соединений при закрытии: %s", stats)
+    await _engine.dispose()
+    _engine = None
+    _session_factory = None
@@ -0,0 +1,141 @@
+# app/database/fsm_storage.py
+
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete
+from sqlalchemy.future import select
+from config import Config
+from app.database.crud import upsert_statement
+from app.database.db import get_async_session
+from app.database.models import FsmRecord
+from app.utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+
+def _dump(data: Dict[str, Any]) -> Optional[str]:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")) if data else None
+
+
+def _load(raw: Optional[str]) -> Dict[str, Any]:
+    return json.loads(raw) if raw else {}
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """
+    Хранилище FSM в базе данных через асинхронный движок SQLAlchemy.
+
+    Состояние и данные хранятся в таблице fsm_states по ключу
+    (bot_id, chat_id, user_id, thread_id, destiny); данные сериализуются в компактный JSON.
+    Записи кэшируются в памяти (write-through): чтение состояния, которое aiogram
+    выполняет на каждый апдейт, обычно не обращается к базе. Кэш рассчитан на то,
+    что апдейты одного пользователя обрабатывает один процесс, поэтому в webhook-режиме
+    без воркеров он по умолчанию выключен (FSM_CACHE_TTL=0).
+    Давно не изменявшиеся записи удаляются cleanup().
+    """
+
+    def __init__(self, cache_size: int = None, cache_ttl: float = None):
+        cache_ttl = Config.FSM_CACHE_TTL if cache_ttl is None else cache_ttl
+        self._cache_enabled = cache_ttl > 0
+        self._cache = TTLCache(maxsize=cache_size or Config.FSM_CACHE_SIZE, ttl=cache_ttl)
+
+    @staticmethod
+    def _key_values(key: StorageKey) -> Dict[str, Any]:
+        return dict(
+            bot_id=key.bot_id,
+            chat_id=key.chat_id,
+            user_id=key.user_id,
+            thread_id=key.thread_id or 0,
+            destiny=key.destiny,
+        )
+
+    def _where(self, key: StorageKey):
+        return [getattr(FsmRecord, column) == value for column, value in self._key_values(key).items()]
+
+    async def _get_record(self, key: StorageKey):
+        """Возвращает (state, data) из кэша или базы."""
+        record = self._cache.get(key)
+        if record is not MISSING:
+            return record
+
+        session = await get_async_session()
+        async with session:
+            result = await session.execute(select(FsmRecord.state, FsmRecord.data).where(*self._where(key)))
+            row = result.one_or_none()
+        record = (row.state, _load(row.data)) if row else (None, {})
+        if self._cache_enabled:
+            self._cache.set(key, record)
+        return record
+
+    async def _write(self, key: StorageKey, state: Optional[str], data: Dict[str, Any]):
+        """
+        Записывает запись в базу, а после успешного коммита — в кэш; пустая запись удаляется.
+        Если запись не удалась, ключ убирается из кэша, и следующее чтение идёт в базу.
+        """
+        try:
+            session = await get_async_session()
+            async with session:
+                if state is None and not data:
+                    await session.execute(delete(FsmRecord).where(*self._where(key)))
+                else:
+                    values = dict(self._key_values(key), state=state, data=_dump(data), updated_at=datetime.utcnow())
+                    stmt = upsert_statement(session, FsmRecord, values, ["state", "data", "updated_at"])
+                    if stmt is None:
+                        await session.merge(FsmRecord(**values))
+                    else:
+                        await session.execute(stmt)
+                await session.commit()
+        except BaseException:
+            self._cache.invalidate(key)
+            raise
+        if self._cache_enabled:
+            self._cache.set(key, (state, data))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        _, data = await self._get_record(key)
+        await self._write(key, state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._get_record(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        state, _ = await self._get_record(key)
+        await self._write(key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._get_record(key)
+        return data.copy()
+
+    async def cleanup(self, max_age: int = None) -> int:
+        """Удаляет записи, не изменявшиеся дольше `max_age` секунд."""
+        max_age = Config.FSM_STATE_TTL if max_age is None else max_age
+        session = await get_async_session()
+        async with session:
+            result = await session.execute(
+                delete(FsmRecord).where(FsmRecord.updated_at < datetime.utcnow() - timedelta(seconds=max_age))
+            )
+            await session.commit()
+        if result.rowcount:
+            # Удалённые записи могли остаться в кэше
+            self._cache.clear()
+            logger.info("Удалено устаревших состояний FSM: %s.", result.rowcount)
+        return result.rowcount
+
+    async def run_cleanup(self, interval: float = 3600):
+        """Периодически удаляет устаревшие состояния FSM."""
+        while True:
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.error("Ошибка при очистке состояний FSM: %s", e)
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        self._cache.clear()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy import Column, BigInteger, Integer, String, Text, Date, DateTime, Index
 from app.database.db import Base
 from datetime import datetime
 
@@ -8,4 +8,91 @@ class User(Base):
     name = Column(String(255), nullable=True)
     username = Column(String(255), nullable=True)
     client_type = Column(String(50), nullable=False)
-    date_joined = Column(DateTime, default=datetime.utcnow, nullable=False)
+    date_joined = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        # Выборка получателей рассылки по типу клиента с постраничным проходом по ID
+        Index("ix_users_client_type_id", "client_type", "id"),
+    )
+
+
+class BroadcastJob(Base):
+    """Рассылка, сохранённая в базе: переживает перезапуск и продолжается с последней контрольной точки."""
+    __tablename__ = "broadcast_jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    client_type = Column(String(50), nullable=False)
+    # Исходное сообщение администратора, которое копируется получателям
+    from_chat_id = Column(BigInteger, nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    created_by = Column(BigInteger, nullable=False)
+    status = Column(String(20), nullable=False, default="running", index=True)
+    # Курсор: ID последнего обработанного получателя (получатели перебираются по возрастанию ID)
+    last_user_id = Column(BigInteger, nullable=False, default=0)
+    # Аренда: экземпляр бота, выполняющий рассылку, и срок, до которого она за ним закреплена
+    owner = Column(String(64), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class BroadcastDelivery(Base):
+    """Результат отправки рассылки одному получателю (журнал доставки)."""
+    __tablename__ = "broadcast_deliveries"
+    # В SQLite автоинкремент работает только у INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    job_id = Column(Integer, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    # "sent" или "failed"
+    status = Column(String(10), nullable=False)
+    # Класс исключения для неудачной отправки (TelegramForbiddenError и т.п.)
+    error = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Одна строка на получателя: повторная отправка после сбоя перезаписывает её
+        Index("ux_broadcast_deliveries_job_user", "job_id", "user_id", unique=True),
+        # Отчёт по рассылке: итоги по статусам и ошибкам, список недоставленных
+        Index("ix_broadcast_deliveries_job_status", "job_id", "status", "error"),
+    )
+
+
+class DailySignup(Base):
+    """Сводка регистраций по дням и типам клиентов для статистики админ-панели."""
+    __tablename__ = "daily_signups"
+    date = Column(Date, primary_key=True)
+    client_type = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ChatCommandScope(Base):
+    """Набор команд меню, установленный для чата (chat_id = 0 — набор по умолчанию)."""
+    __tablename__ = "chat_command_scopes"
+    chat_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    # Роль чата ("admin", "client") или отпечаток набора команд по умолчанию
+    role = Column(String(64), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class MediaFile(Base):
+    """file_id Telegram для загруженного статического файла, по хэшу его содержимого."""
+    __tablename__ = "media_files"
+    content_hash = Column(String(64), primary_key=True)
+    file_path = Column(String(255), nullable=False)
+    file_id = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class FsmRecord(Base):
+    """Состояние и данные FSM aiogram для пары чат/пользователь."""
+    __tablename__ = "fsm_states"
+    bot_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    chat_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    thread_id = Column(BigInteger, primary_key=True, autoincrement=False, default=0)
+    destiny = Column(String(32), primary_key=True, default="default")
+    state = Column(String(255), nullable=True)
+    # Данные FSM в компактном JSON
+    data = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,8 @@
+# app/database/user_cache.py
+
+from config import Config
+from app.utils.cache import TTLCache
+
+# Кэш пользователей: user_id -> User или None (пользователь не зарегистрирован).
+# Заполняется middleware, сбрасывается функциями crud, изменяющими пользователя.
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
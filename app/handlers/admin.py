@@ -11,11 +11,16 @@ from app.keyboards.admin_kb import (
     get_file_management_menu,
     get_subscriber_stats_menu,
 )
-from app.database.crud import get_subscriber_stats  # Функция для получения статистики
+from app.database.crud import get_signup_breakdown  # Статистика по сводке регистраций
 from app.database.db import get_async_session
 from app.handlers.common import is_staff  # Функция проверки прав администратора
+from app.services.metrics import metrics
+from app.services.resources import resource_store
+from app.services.staff import staff_registry
+from app.utils.callback_dispatch import CallbackDispatcher
 
 router = Router()
+callbacks = CallbackDispatcher(router)
 logger = logging.getLogger(__name__)
 
 
@@ -24,11 +29,11 @@ async def admin_panel(message: types.Message, state: FSMContext):
     """Команда для отображения админ-панели."""
     user_id = message.from_user.id
     username = message.from_user.username or "Без имени"
-    logger.info(f"Команда /admin_panel вызвана пользователем: {username} (user_id: {user_id})")
+    logger.info("Команда /admin_panel вызвана пользователем: %s (user_id: %s)", username, user_id)
 
     # Проверка прав администратора
     if not is_staff(user_id=user_id, username=username):
-        logger.warning(f"Пользователь {user_id} ({username}) попытался использовать /admin_panel без прав.")
+        logger.warning("Пользователь %s (%s) попытался использовать /admin_panel без прав.", user_id, username)
         await message.answer("У вас нет прав для выполнения этой команды.")
         return
 
@@ -36,11 +41,11 @@ async def admin_panel(message: types.Message, state: FSMContext):
         await message.answer("Добро пожаловать в админ-панель.", reply_markup=get_admin_menu())
         logger.info("Админ-панель успешно отображена.")
     except Exception as e:
-        logger.error(f"Ошибка при отображении админ-панели: {e}")
+        logger.error("Ошибка при отображении админ-панели: %s", e)
         await message.answer("Произошла ошибка при отображении админ-панели.")
 
 
-@router.callback_query(lambda c: c.data == "manage_files")
+@callbacks.register("manage_files")
 async def manage_files(callback_query: CallbackQuery):
     """Показывает меню управления файлами."""
     logger.info("Вызвано меню управления файлами.")
@@ -49,18 +54,18 @@ async def manage_files(callback_query: CallbackQuery):
         await callback_query.answer()
         logger.info("Меню управления файлами успешно отображено.")
     except Exception as e:
-        logger.error(f"Ошибка при отображении меню управления файлами: {e}")
+        logger.error("Ошибка при отображении меню управления файлами: %s", e)
         await callback_query.message.answer("Произошла ошибка при отображении меню управления файлами.")
         await callback_query.answer()
 
 
-@router.callback_query(lambda c: c.data == "view_files")
+@callbacks.register("view_files")
 async def view_files(callback_query: CallbackQuery):
     """Отображает список доступных файлов в папке resources."""
     logger.info("Запрос списка файлов в папке resources.")
     try:
         files = os.listdir("resources")
-        logger.debug(f"Файлы в папке resources: {files}")
+        logger.debug("Файлы в папке resources: %s", files)
         if files:
             files_text = "\n".join(files)
             await callback_query.message.answer(f"Доступные файлы:\n{files_text}")
@@ -73,79 +78,113 @@ async def view_files(callback_query: CallbackQuery):
         await callback_query.message.answer("Папка resources не найдена.")
         await callback_query.answer()
     except Exception as e:
-        logger.error(f"Ошибка при отображении списка файлов: {e}")
+        logger.error("Ошибка при отображении списка файлов: %s", e)
         await callback_query.message.answer("Произошла ошибка при отображении списка файлов.")
         await callback_query.answer()
 
 
-@router.callback_query(lambda c: c.data == "subscriber_stats")
+@callbacks.register("reload_resources")
+async def reload_resources(callback_query: CallbackQuery):
+    """Сбрасывает кэш текстовых ресурсов и перечитывает список сотрудников."""
+    logger.info("Запрошено обновление текстовых ресурсов.")
+    try:
+        resource_store.invalidate()
+        staff_registry.reload()
+        await callback_query.message.answer("Тексты и список сотрудников будут перечитаны из файлов.")
+    except Exception as e:
+        logger.error("Ошибка при обновлении текстовых ресурсов: %s", e)
+        await callback_query.message.answer("Произошла ошибка при обновлении текстов.")
+    finally:
+        await callback_query.answer()
+
+
+@callbacks.register("bot_metrics")
+async def show_metrics(callback_query: CallbackQuery):
+    """Показывает задержки и ошибки обработчиков с момента запуска (текущего процесса)."""
+    user = callback_query.from_user
+    if not is_staff(user_id=user.id, username=user.username):
+        logger.warning("Пользователь %s (%s) запросил метрики без прав.", user.id, user.username)
+        await callback_query.answer("У вас нет прав для просмотра метрик.", show_alert=True)
+        return
+
+    try:
+        await callback_query.message.answer(metrics.format_summary(), parse_mode=None)
+    except Exception as e:
+        logger.error("Ошибка при отображении метрик: %s", e)
+        await callback_query.message.answer("Произошла ошибка при отображении метрик.")
+    finally:
+        await callback_query.answer()
+
+
+# Кнопки меню статистики: callback_data -> (период, подпись)
+SUBSCRIBER_STATS_ACTIONS = {
+    "current_subscribers": ("all", "Общее количество подписчиков"),
+    "daily_growth": ("today", "Подписки за сегодня"),
+    "weekly_growth": ("week", "Подписки за последнюю неделю"),
+    "monthly_growth": ("month", "Подписки за последний месяц"),
+    "quarterly_growth": ("quarter", "Подписки за последний квартал"),
+    "half_year_growth": ("half_year", "Подписки за последние полгода"),
+    "yearly_growth": ("year", "Подписки за последний год"),
+}
+
+
+# Подписи типов клиентов в статистике
+CLIENT_TYPE_LABELS = {
+    "individual": "индивидуальные",
+    "organizer": "организаторы",
+    "admin": "сотрудники",
+}
+
+
+def format_signup_counts(label: str, counts: dict) -> str:
+    """Строка вида 'Подписки за неделю: 12 (индивидуальные: 9, организаторы: 3)'."""
+    total = sum(counts.values())
+    parts = [
+        f"{CLIENT_TYPE_LABELS.get(client_type, client_type)}: {count}"
+        for client_type, count in sorted(counts.items()) if count
+    ]
+    return f"{label}: {total}" + (f" ({', '.join(parts)})" if parts else "")
+
+
+@callbacks.register("subscriber_stats")
 async def subscriber_stats_menu(callback_query: CallbackQuery):
-    """Отображает меню статистики подписчиков."""
+    """Отображает сводку по всем периодам и меню статистики подписчиков."""
     logger.info("Вызвано меню статистики подписчиков.")
     try:
+        session = await get_async_session()
+        async with session:
+            breakdown = await get_signup_breakdown(session)
+        summary_text = "\n".join(
+            format_signup_counts(label, breakdown[period]) for period, label in SUBSCRIBER_STATS_ACTIONS.values()
+        )
         await callback_query.message.answer(
-            "Выберите интересующий период статистики:",
+            f"{summary_text}\n\nВыберите интересующий период статистики:",
             reply_markup=get_subscriber_stats_menu()
         )
         await callback_query.answer()
         logger.info("Меню статистики подписчиков успешно отображено.")
     except Exception as e:
-        logger.error(f"Ошибка при отображении меню статистики подписчиков: {e}")
+        logger.error("Ошибка при отображении меню статистики подписчиков: %s", e)
         await callback_query.message.answer("Ошибка при отображении меню статистики подписчиков.")
         await callback_query.answer()
 
 
-@router.callback_query(lambda c: c.data in [
-    "current_subscribers",
-    "daily_growth",
-    "weekly_growth",
-    "monthly_growth",
-    "quarterly_growth",
-    "half_year_growth",
-    "yearly_growth"
-])
+@callbacks.register(*SUBSCRIBER_STATS_ACTIONS)
 async def subscriber_growth(callback_query: CallbackQuery, bot: Bot):
     """Показывает количество подписчиков за выбранный период."""
-    period_map = {
-        "current_subscribers": "all",
-        "daily_growth": "today",
-        "weekly_growth": "week",
-        "monthly_growth": "month",
-        "quarterly_growth": "quarter",
-        "half_year_growth": "half_year",
-        "yearly_growth": "year",
-    }
-
     action = callback_query.data
-    period = period_map.get(action, "all")
-    logger.info(f"Обработчик '{action}' вызван.")
+    period, label = SUBSCRIBER_STATS_ACTIONS[action]
+    logger.info("Обработчик '%s' вызван.", action)
 
     try:
         session = await get_async_session()
         async with session:
-            logger.info(f"Открыта сессия базы данных для статистики за период: {period}.")
-            subscriber_count = await get_subscriber_stats(period, session)
-            if action == "current_subscribers":
-                response_text = f"Общее количество подписчиков: {subscriber_count}"
-            elif action == "daily_growth":
-                response_text = f"Подписки за сегодня: {subscriber_count}"
-            elif action == "weekly_growth":
-                response_text = f"Подписки за последнюю неделю: {subscriber_count}"
-            elif action == "monthly_growth":
-                response_text = f"Подписки за последний месяц: {subscriber_count}"
-            elif action == "quarterly_growth":
-                response_text = f"Подписки за последний квартал: {subscriber_count}"
-            elif action == "half_year_growth":
-                response_text = f"Подписки за последние полгода: {subscriber_count}"
-            elif action == "yearly_growth":
-                response_text = f"Подписки за последний год: {subscriber_count}"
-            else:
-                response_text = f"Подписчики за период '{period}': {subscriber_count}"
-
-            await callback_query.message.answer(response_text)
-            logger.info(f"Статистика за период '{period}' успешно отправлена пользователю.")
+            breakdown = await get_signup_breakdown(session)
+
+        await callback_query.message.answer(format_signup_counts(label, breakdown[period]))
+        logger.info("Статистика за период '%s' успешно отправлена пользователю.", period)
     except Exception as e:
-        logger.error(f"Ошибка при получении статистики за период '{period}': {e}")
+        logger.error("Ошибка при получении статистики за период '%s': %s", period, e)
         await callback_query.message.answer("Ошибка при получении статистики.")
     finally:
         await callback_query.answer()
@@ -4,16 +4,26 @@ import os
 import logging
 from aiogram import Router, types, F, Bot
 from aiogram.types import Message, Document, CallbackQuery, ContentType
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from app.keyboards.admin_kb import get_broadcast_client_type_menu
 from app.handlers.common import is_staff  # Функция проверки прав администратора
+from app.services.staff import staff_registry
+from app.services.newsletter import start_broadcast_job
+from app.database.crud import (
+    count_recipients,
+    create_broadcast_job,
+    get_broadcast_delivery_summary,
+    get_broadcast_job,
+    get_failed_deliveries,
+    get_latest_broadcast_job,
+)
 from app.database.db import get_async_session
-from app.database.models import User
-from sqlalchemy.future import select
+from app.utils.callback_dispatch import CallbackDispatcher
 
 router = Router()
+callbacks = CallbackDispatcher(router)
 logger = logging.getLogger(__name__)
 
 class BroadcastStates(StatesGroup):
@@ -26,10 +36,10 @@ async def start_broadcast(message: Message, state: FSMContext):
     """Начало процесса рассылки сообщений через команду /broadcast."""
     user_id = message.from_user.id
     username = message.from_user.username or "Без имени"
-    logger.info(f"Команда /broadcast получена от пользователя: user_id={user_id}, username={username}")
+    logger.info("Команда /broadcast получена от пользователя: user_id=%s, username=%s", user_id, username)
 
     if not is_staff(user_id=user_id, username=username):
-        logger.warning(f"Пользователь {user_id} ({username}) попытался использовать /broadcast без прав.")
+        logger.warning("Пользователь %s (%s) попытался использовать /broadcast без прав.", user_id, username)
         await message.answer("У вас нет прав для выполнения этой команды.")
         return
 
@@ -38,10 +48,10 @@ async def start_broadcast(message: Message, state: FSMContext):
         await state.set_state(BroadcastStates.waiting_for_client_type)
         logger.info("Меню выбора категории клиентов для рассылки успешно отображено.")
     except Exception as e:
-        logger.error(f"Ошибка при отображении меню рассылки: {e}")
+        logger.error("Ошибка при отображении меню рассылки: %s", e)
         await message.answer("Произошла ошибка при отображении меню рассылки.")
 
-@router.callback_query(lambda c: c.data == "broadcast_select_client_type")
+@callbacks.register("broadcast_select_client_type")
 async def handle_broadcast_select_client_type(callback_query: CallbackQuery, state: FSMContext):
     """Обработка нажатия кнопки 'Запустить рассылку' в админ-панели."""
     try:
@@ -50,7 +60,7 @@ async def handle_broadcast_select_client_type(callback_query: CallbackQuery, sta
         await callback_query.answer()
         logger.info("Меню выбора категории клиентов для рассылки успешно отображено через кнопку.")
     except Exception as e:
-        logger.error(f"Ошибка при отображении меню рассылки: {e}")
+        logger.error("Ошибка при отображении меню рассылки: %s", e)
         await callback_query.message.answer("Произошла ошибка при отображении меню рассылки.")
         await callback_query.answer()
 
@@ -58,7 +68,7 @@ async def handle_broadcast_select_client_type(callback_query: CallbackQuery, sta
 async def select_client_type(callback_query: CallbackQuery, state: FSMContext):
     """Обработка выбора категории клиентов для рассылки."""
     broadcast_client_type = callback_query.data
-    logger.info(f"Тип клиентов для рассылки установлен: {broadcast_client_type}")
+    logger.info("Тип клиентов для рассылки установлен: %s", broadcast_client_type)
 
     # Преобразуем callback_data в тип клиента, если необходимо
     # Например, "broadcast_individual" -> "individual"
@@ -84,81 +94,72 @@ async def handle_broadcast_message(message: Message, state: FSMContext):
         logger.warning("Рассылка начата без выбора категории клиентов.")
         return
 
-    # Получение списка клиентов из базы данных
-    client_ids = []
+    # Подсчёт получателей в базе: строки пользователей не загружаются,
+    # сами получатели будут выбираться пачками при отправке
     try:
+        staff_ids, staff_usernames = staff_registry.snapshot()
         session = await get_async_session()
         async with session:
-            result = await session.execute(
-                select(User).where(User.client_type == broadcast_client_type)
+            recipient_count = await count_recipients(
+                broadcast_client_type, session, staff_ids=staff_ids, staff_usernames=staff_usernames
             )
-            all_users = result.scalars().all()
-
-            for user in all_users:
-                if not is_staff(user_id=user.id, username=user.username):
-                    client_ids.append(user.id)
     except Exception as e:
-        logger.error(f"Ошибка при получении списка клиентов: {e}")
+        logger.error("Ошибка при получении списка клиентов: %s", e)
         await message.answer("Произошла ошибка при подготовке рассылки. Попробуйте позже.")
         await state.clear()
         return
 
-    if not client_ids:
+    if not recipient_count:
         await message.answer("Нет клиентов для рассылки.")
         await state.clear()
         logger.info("Нет клиентов для рассылки.")
         return
 
-    # Сохранение информации о рассылке в состоянии
+    # В состоянии хранится только ссылка на сообщение, а не сам объект Message
     await state.update_data(
-        message_to_broadcast=message,
-        client_ids=client_ids
+        draft_chat_id=message.chat.id,
+        draft_message_id=message.message_id,
+        recipient_count=recipient_count
     )
 
-    await message.answer(f"Сообщение готово к отправке {len(client_ids)} пользователям. Отправить?", reply_markup=get_confirmation_keyboard())
+    await message.answer(f"Сообщение готово к отправке {recipient_count} пользователям. Отправить?", reply_markup=get_confirmation_keyboard())
     await state.set_state(BroadcastStates.waiting_for_confirmation)
-    logger.info(f"Готовность к рассылке сообщений {len(client_ids)} пользователям.")
+    logger.info("Готовность к рассылке сообщений %s пользователям.", recipient_count)
+
+# Клавиатура подтверждения создаётся один раз
+CONFIRMATION_KEYBOARD = types.InlineKeyboardMarkup(inline_keyboard=[
+    [types.InlineKeyboardButton(text="✅ Отправить", callback_data="confirm_broadcast")],
+    [types.InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_broadcast")]
+])
+
 
 def get_confirmation_keyboard():
     """Клавиатура с кнопками подтверждения и отмены."""
-    buttons = [
-        [types.InlineKeyboardButton(text="✅ Отправить", callback_data="confirm_broadcast")],
-        [types.InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_broadcast")]
-    ]
-    return types.InlineKeyboardMarkup(inline_keyboard=buttons)
+    return CONFIRMATION_KEYBOARD
 
 @router.callback_query(BroadcastStates.waiting_for_confirmation, lambda c: c.data == "confirm_broadcast")
 async def confirm_broadcast(callback_query: CallbackQuery, state: FSMContext, bot: Bot):
-    """Подтверждение и отправка рассылки."""
+    """Подтверждение рассылки: создаёт задание в базе и запускает его в фоне."""
     data = await state.get_data()
-    message_to_broadcast: Message = data.get("message_to_broadcast")
-    client_ids = data.get("client_ids", [])
+    broadcast_client_type = data.get("broadcast_client_type")
 
     try:
-        await callback_query.message.answer("Начинаю рассылку...")
-        await callback_query.answer()
+        session = await get_async_session()
+        async with session:
+            job = await create_broadcast_job(
+                client_type=broadcast_client_type,
+                from_chat_id=data["draft_chat_id"],
+                message_id=data["draft_message_id"],
+                created_by=callback_query.from_user.id,
+                session=session
+            )
 
-        success_count = 0
-        failure_count = 0
-
-        for user_id in client_ids:
-            try:
-                if message_to_broadcast.content_type == ContentType.TEXT:
-                    await bot.send_message(chat_id=user_id, text=message_to_broadcast.text)
-                elif message_to_broadcast.content_type == ContentType.DOCUMENT:
-                    await bot.send_document(chat_id=user_id, document=message_to_broadcast.document.file_id, caption=message_to_broadcast.caption)
-                elif message_to_broadcast.content_type == ContentType.PHOTO:
-                    await bot.send_photo(chat_id=user_id, photo=message_to_broadcast.photo[-1].file_id, caption=message_to_broadcast.caption)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Не удалось отправить сообщение пользователю {user_id}: {e}")
-                failure_count += 1
-
-        await callback_query.message.answer(f"Рассылка завершена. Успешно: {success_count}, Ошибок: {failure_count}.")
+        start_broadcast_job(bot, job.id)
         await state.clear()
-        logger.info(f"Рассылка завершена. Успешно: {success_count}, Ошибок: {failure_count}.")
+        await callback_query.message.answer(f"Рассылка #{job.id} запущена. Отчёт придёт по завершении.")
+        logger.info("Рассылка #%s для '%s' запущена пользователем %s.", job.id, broadcast_client_type, callback_query.from_user.id)
     except Exception as e:
-        logger.error(f"Ошибка при отправке рассылки: {e}")
+        logger.error("Ошибка при запуске рассылки: %s", e)
         await callback_query.message.answer("Произошла ошибка при отправке рассылки.")
     finally:
         await callback_query.answer()
@@ -172,6 +173,64 @@ async def cancel_broadcast(callback_query: CallbackQuery, state: FSMContext):
         await callback_query.answer()
         logger.info("Рассылка отменена пользователем.")
     except Exception as e:
-        logger.error(f"Ошибка при отмене рассылки: {e}")
+        logger.error("Ошибка при отмене рассылки: %s", e)
         await callback_query.message.answer("Произошла ошибка при отмене рассылки.")
         await callback_query.answer()
+
+# Сколько последних недоставленных получателей показывать в отчёте
+REPORT_FAILED_LIMIT = 20
+
+
+def format_delivery_report(job, summary, failed) -> str:
+    """Текст отчёта о доставке рассылки по журналу broadcast_deliveries."""
+    lines = [
+        f"Рассылка #{job.id} ({job.client_type}), статус: {job.status}",
+        f"Успешно: {job.sent_count}, ошибок: {job.failed_count}",
+    ]
+    if not summary:
+        lines.append("Журнал доставки пуст.")
+        return "\n".join(lines)
+
+    lines.append("")
+    lines.append("Журнал доставки:")
+    for status, error, count in summary:
+        lines.append(f"  {status}{f' ({error})' if error else ''}: {count}")
+    if failed:
+        lines.append("")
+        lines.append(f"Последние недоставленные (до {REPORT_FAILED_LIMIT}):")
+        for user_id, error, created_at in failed:
+            lines.append(f"  {user_id} — {error}, {created_at:%Y-%m-%d %H:%M:%S}")
+    return "\n".join(lines)
+
+
+@router.message(Command("broadcast_report"))
+async def broadcast_report(message: Message, command: CommandObject):
+    """Отчёт о доставке рассылки: /broadcast_report [номер] (без номера — последняя рассылка)."""
+    user_id = message.from_user.id
+    username = message.from_user.username or "Без имени"
+    if not is_staff(user_id=user_id, username=username):
+        logger.warning("Пользователь %s (%s) попытался использовать /broadcast_report без прав.", user_id, username)
+        await message.answer("У вас нет прав для выполнения этой команды.")
+        return
+
+    argument = (command.args or "").strip().lstrip("#")
+    if argument and not argument.isdigit():
+        await message.answer("Использование: /broadcast_report [номер рассылки]")
+        return
+
+    try:
+        session = await get_async_session()
+        async with session:
+            if argument:
+                job = await get_broadcast_job(int(argument), session)
+            else:
+                job = await get_latest_broadcast_job(session)
+            if job is None:
+                await message.answer("Рассылка не найдена.")
+                return
+            summary = await get_broadcast_delivery_summary(job.id, session)
+            failed = await get_failed_deliveries(job.id, REPORT_FAILED_LIMIT, session)
+        await message.answer(format_delivery_report(job, summary, failed), parse_mode=None)
+    except Exception as e:
+        logger.error("Ошибка при формировании отчёта о рассылке: %s", e)
+        await message.answer("Произошла ошибка при формировании отчёта о рассылке.")
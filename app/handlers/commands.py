@@ -4,17 +4,10 @@ from aiogram.types import Message
 from config import Config
 from app.keyboards.client_kb import get_two_column_keyboard
 from app.keyboards.admin_kb import get_admin_menu
-from app.database.crud import get_user  # Предполагается, что get_user возвращает данные пользователя
+from app.database.models import User
 from app.handlers.common import is_staff
-from app.database.db import get_async_session
 import logging
 
-# Настройка логгера
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
 logger = logging.getLogger(__name__)
 
 router = Router()
@@ -36,30 +29,27 @@ async def website_command_handler(message: Message):
 
 
 @router.message(Command("menu"))
-async def show_main_menu(message: Message):
+async def show_main_menu(message: Message, db_user: User = None):
     """Обработчик для команды /menu. Проверяет статус пользователя через базу данных."""
     user_id = message.from_user.id
     username = message.from_user.username or "Без имени"
-    logger.info(f"Команда /menu получена от пользователя: user_id={user_id}, username={username}")
+    logger.info("Команда /menu получена от пользователя: user_id=%s, username=%s", user_id, username)
 
     # Используем функцию is_staff() для проверки администратора
     is_admin = is_staff(user_id=user_id, username=username)
-    logger.debug(f"Проверка администратора: user_id={user_id}, username={username}, is_admin={is_admin}")
+    logger.debug("Проверка администратора: user_id=%s, username=%s, is_admin=%s", user_id, username, is_admin)
 
     if is_admin:
         # Если админ, показываем админское меню
-        logger.info(f"Пользователь {user_id} ({username}) получает админ-панель.")
+        logger.info("Пользователь %s (%s) получает админ-панель.", user_id, username)
         await message.answer("Админ-панель:", reply_markup=get_admin_menu())
     else:
-        # Получаем информацию о пользователе из базы данных
-        session = await get_async_session()
-        async with session:
-            user = await get_user(user_id, session)
-            is_organizer = user.client_type == "organizer" if user else False
-            logger.info(f"Пользователь {user_id} ({username}) получает клиентское меню. Организатор: {is_organizer}")
-
-            # Отправляем клиентское меню
-            await message.answer(
-                "Выберите действие из меню:",
-                reply_markup=get_two_column_keyboard(is_organizer=is_organizer)
-            )
\ No newline at end of file
+        # Запись пользователя уже получена middleware (из кэша или базы)
+        is_organizer = db_user.client_type == "organizer" if db_user else False
+        logger.info("Пользователь %s (%s) получает клиентское меню. Организатор: %s", user_id, username, is_organizer)
+
+        # Отправляем клиентское меню
+        await message.answer(
+            "Выберите действие из меню:",
+            reply_markup=get_two_column_keyboard(is_organizer=is_organizer)
+        )
\ No newline at end of file
@@ -4,8 +4,10 @@ from aiogram.types import Message, Document, InlineKeyboardButton, InlineKeyboar
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
+from app.utils.callback_dispatch import CallbackDispatcher
 
 router = Router()
+callbacks = CallbackDispatcher(router)
 logger = logging.getLogger(__name__)
 
 SUPPORT_CHAT_ID = -1002319130163  # Убедитесь, что это правильный ID вашей группы поддержки
@@ -22,7 +24,7 @@ class SupportStates(StatesGroup):
 @router.message(Command("manager"))
 async def manager_command_handler(message: Message, state: FSMContext):
     """Запрашивает вопрос у пользователя, переходя в состояние ожидания."""
-    logger.info(f"Команда /manager вызвана пользователем: {message.from_user.username}")
+    logger.info("Команда /manager вызвана пользователем: %s", message.from_user.username)
     await message.answer("Вы обратились в службу поддержки. Пожалуйста, опишите свою проблему, и мы ответим вам в ближайшее время.")
     await state.set_state(SupportStates.waiting_for_question)
 
@@ -71,7 +73,7 @@ async def forward_document_to_support(message: Message, state: FSMContext):
     await message.answer("Ваш документ был отправлен в поддержку.")
     await state.clear()
 
-@router.callback_query(lambda c: c.data and c.data.startswith("reply_to:"))
+@callbacks.register(prefix="reply_to")
 async def prompt_reply(callback_query: CallbackQuery, state: FSMContext):
     """Обработчик для нажатия кнопки 'Ответить' менеджером."""
     user_id = int(callback_query.data.split(":")[1])
@@ -123,7 +125,7 @@ async def send_document_reply_to_client(message: Message, state: FSMContext):
     # Сброс состояния
     await state.clear()
 
-@router.callback_query(lambda c: c.data and c.data.startswith("cancel_reply:"))
+@callbacks.register(prefix="cancel_reply")
 async def cancel_reply(callback_query: CallbackQuery, state: FSMContext):
     """Отмена отправки ответа клиенту."""
     await state.clear()
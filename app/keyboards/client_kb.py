@@ -1,14 +1,16 @@
+from types import MappingProxyType
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-def get_client_type_keyboard():
+
+def _build_client_type_keyboard():
     """Клавиатура для выбора типа клиента."""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+    return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Я организатор мероприятий", callback_data="client_type:organizer")],
         [InlineKeyboardButton(text="Я индивидуальный клиент", callback_data="client_type:individual")]
     ])
-    return keyboard
 
-def get_two_column_keyboard(is_organizer=False):
+
+def _build_two_column_keyboard(is_organizer=False):
     """Создает меню с кнопками в две колонки."""
     buttons = [
         InlineKeyboardButton(text="Узнать погоду в Сочи", callback_data="weather"),
@@ -29,11 +31,30 @@ def get_two_column_keyboard(is_organizer=False):
             InlineKeyboardButton(text="Чат для организаторов", callback_data="organizer_chat")
         ])
 
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [buttons[i], buttons[i + 1]] for i in range(0, len(buttons) - 1, 2)
-    ])
-    
+    rows = [[buttons[i], buttons[i + 1]] for i in range(0, len(buttons) - 1, 2)]
     if len(buttons) % 2 != 0:
-        keyboard.inline_keyboard.append([buttons[-1]])
+        rows.append([buttons[-1]])
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def _build_client_keyboards():
+    """Строит все клиентские клавиатуры (один раз, при импорте)."""
+    return MappingProxyType({
+        "client_type": _build_client_type_keyboard(),
+        "menu": _build_two_column_keyboard(is_organizer=False),
+        "organizer_menu": _build_two_column_keyboard(is_organizer=True),
+    })
 
-    return keyboard
+
+_keyboards = _build_client_keyboards()
+
+
+def get_client_type_keyboard():
+    """Клавиатура для выбора типа клиента."""
+    return _keyboards["client_type"]
+
+
+def get_two_column_keyboard(is_organizer=False):
+    """Меню с кнопками в две колонки (для организаторов — с дополнительными кнопками)."""
+    return _keyboards["organizer_menu" if is_organizer else "menu"]
@@ -1,32 +1,89 @@
+import hashlib
+import logging
 from aiogram import Bot, types
 from aiogram.types import BotCommand
-import logging
+from config import Config
+from app.database.crud import get_command_scope_role, set_command_scope_role
+from app.database.db import get_async_session
+from app.utils.cache import TTLCache, MISSING
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Наборы команд вычисляются один раз при импорте
+ADMIN_COMMANDS = [
+    BotCommand(command="start", description="Запустить бота"),
+    BotCommand(command="menu", description="Показать главное меню"),
+    BotCommand(command="shop", description="Перейти в магазин"),
+    BotCommand(command="website", description="Перейти на сайт"),
+]
+# Команду manager видят только клиенты
+CLIENT_COMMANDS = ADMIN_COMMANDS + [
+    BotCommand(command="manager", description="Связаться с менеджером"),
+]
+
+# Клиентам достаточно набора по умолчанию, персональный набор ставится только сотрудникам
+ROLE_ADMIN = "admin"
+ROLE_CLIENT = "client"
+DEFAULT_SCOPE_CHAT_ID = 0
+
+# Известные роли чатов: chat_id -> "admin", "client" (действует набор по умолчанию)
+# или None (неизвестно: запись в базе отсутствует)
+_chat_roles = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=24 * 60 * 60)
+
 
-async def set_bot_commands(bot: Bot, is_admin: bool = False, user_id: int = None):
-    """Устанавливает команды для встроенного меню Telegram для конкретного пользователя."""
-    commands = [
-        BotCommand(command="start", description="Запустить бота"),
-        BotCommand(command="menu", description="Показать главное меню"),
-        BotCommand(command="shop", description="Перейти в магазин"),
-        BotCommand(command="website", description="Перейти на сайт"),
-    ]
+def _commands_fingerprint(commands) -> str:
+    raw = "|".join(f"{command.command}:{command.description}" for command in commands)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
-    # Добавляем команду manager только для клиентов
-    if not is_admin:
-        commands.append(BotCommand(command="manager", description="Связаться с менеджером"))
+
+async def ensure_default_commands(bot: Bot):
+    """Устанавливает набор команд по умолчанию, только если он изменился с прошлого запуска."""
+    fingerprint = _commands_fingerprint(CLIENT_COMMANDS)
+    session = await get_async_session()
+    async with session:
+        if await get_command_scope_role(DEFAULT_SCOPE_CHAT_ID, session) == fingerprint:
+            logger.info("Команды по умолчанию не изменились, обновление не требуется.")
+            return
+        try:
+            await bot.set_my_commands(CLIENT_COMMANDS)
+        except Exception as e:
+            logger.error("Ошибка при установке команд: %s", e)
+            return
+        await set_command_scope_role(DEFAULT_SCOPE_CHAT_ID, fingerprint, session)
+        logger.info("Команды по умолчанию успешно установлены.")
+
+
+async def sync_user_commands(bot: Bot, user_id: int, is_admin: bool):
+    """
+    Приводит команды чата пользователя в соответствие с его ролью.
+
+    Запрос к Bot API выполняется только при смене роли: сотруднику ставится
+    персональный набор, при потере прав персональный набор удаляется.
+    Роли хранятся в памяти и в таблице chat_command_scopes. Чат без записи считается
+    неизвестным: персональный набор мог остаться от прежней установки команд при каждом
+    /start, поэтому для такого клиента набор один раз удаляется.
+    """
+    desired = ROLE_ADMIN if is_admin else ROLE_CLIENT
+    known = _chat_roles.get(user_id)
+    if known == desired:
+        return
 
     try:
-        if user_id:
-            # Устанавливаем команды только для конкретного пользователя
-            await bot.set_my_commands(commands, scope=types.BotCommandScopeChat(chat_id=user_id))
-        else:
-            # Устанавливаем команды для всех (общий fallback)
-            await bot.set_my_commands(commands)
-
-        logger.info(f"Команды успешно установлены для {'админа' if is_admin else 'клиента'} (user_id: {user_id}).")
+        session = await get_async_session()
+        async with session:
+            if known is MISSING:
+                known = await get_command_scope_role(user_id, session)
+                _chat_roles.set(user_id, known)
+            if known == desired:
+                return
+
+            scope = types.BotCommandScopeChat(chat_id=user_id)
+            if desired == ROLE_ADMIN:
+                await bot.set_my_commands(ADMIN_COMMANDS, scope=scope)
+            else:
+                await bot.delete_my_commands(scope=scope)
+            await set_command_scope_role(user_id, desired, session)
+            _chat_roles.set(user_id, desired)
+            logger.info("Команды пользователя %s обновлены: %s.", user_id, 'админ' if is_admin else 'клиент')
     except Exception as e:
-        logger.error(f"Ошибка при установке команд: {e}")
+        logger.error("Ошибка при установке команд для пользователя %s: %s", user_id, e)
@@ -0,0 +1,132 @@
+# app/main.py
+
+import time
+import asyncio
+import logging
+from typing import List
+from aiogram import Bot, Dispatcher
+from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from config import Config
+from app.database.fsm_storage import SQLAlchemyStorage
+from app.handlers import (
+    common_router,
+    client_router,
+    admin_router,
+    support_router,
+    commands_router,
+    broadcast_router
+)
+from app.keyboards.set_commands import ensure_default_commands
+from app.middlewares import MetricsMiddleware, UserContextMiddleware
+from app.services.http import close_http_session
+from app.services.delivery_log import run_delivery_log_cleanup
+from app.services.newsletter import run_broadcast_resume, stop_broadcast_jobs
+from app.services.signups import run_signups_compaction
+
+logger = logging.getLogger(__name__)
+
+
+def create_bot() -> Bot:
+    """Создаёт бота; при заданном TELEGRAM_API_URL запросы идут на локальный Bot API сервер."""
+    session = None
+    if Config.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(Config.TELEGRAM_API_URL))
+    return Bot(
+        token=Config.BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode="HTML")
+    )
+
+
+def create_storage() -> BaseStorage:
+    """Создаёт хранилище FSM согласно Config.FSM_STORAGE."""
+    if Config.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return SQLAlchemyStorage()
+
+
+def create_dispatcher(storage: BaseStorage = None, run_background: bool = True) -> Dispatcher:
+    """
+    Собирает диспетчер: хранилище FSM, middleware, роутеры и обработчики запуска/остановки.
+
+    Роутеры подключаются к одному диспетчеру, поэтому в процессе он создаётся один раз.
+    `run_background=False` — для дополнительных воркеров: команды меню, продолжение
+    рассылок и фоновые задачи выполняет только основной процесс.
+    """
+    dp = Dispatcher(storage=storage or create_storage(), run_background=run_background)
+
+    # Запись пользователя из базы (через кэш) для обработчиков
+    dp.message.outer_middleware(UserContextMiddleware())
+    dp.callback_query.outer_middleware(UserContextMiddleware())
+
+    # Подключение роутеров; время выполнения обработчиков каждого из них попадает в метрики
+    metrics_middleware = MetricsMiddleware()
+    for router in (
+        common_router,
+        client_router,
+        admin_router,
+        support_router,
+        commands_router,
+        broadcast_router,
+    ):
+        router.message.middleware(metrics_middleware)
+        router.callback_query.middleware(metrics_middleware)
+        dp.include_router(router)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+async def set_webhook(bot: Bot, allowed_updates: List[str] = None):
+    """Регистрирует webhook в Telegram (если задан публичный адрес WEBHOOK_BASE_URL)."""
+    if not Config.WEBHOOK_BASE_URL:
+        logger.warning("WEBHOOK_BASE_URL не задан — webhook в Telegram не регистрируется.")
+        return
+    url = f"{Config.WEBHOOK_BASE_URL}{Config.WEBHOOK_PATH}"
+    await bot.set_webhook(
+        url=url,
+        secret_token=Config.WEBHOOK_SECRET or None,
+        allowed_updates=allowed_updates,
+    )
+    logger.info("Webhook установлен: %s", url)
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher, run_background: bool = True):
+    """Общий запуск для polling и webhook: команды меню, рассылки и фоновые задачи."""
+    if not run_background:
+        return
+    started = time.perf_counter()
+
+    # Продолжение рассылок, прерванных перезапуском или оставленных остановленным экземпляром:
+    # рассылку выполняет тот экземпляр, который захватил её аренду
+    tasks = [asyncio.create_task(run_broadcast_resume(bot))]
+
+    # Установка команд меню по умолчанию (только если набор изменился)
+    await ensure_default_commands(bot)
+
+    # Фоновые задачи обслуживания: пересчёт сводки регистраций, очистка журнала доставки
+    # и устаревших состояний FSM
+    if Config.RUN_BACKGROUND_TASKS:
+        tasks.append(asyncio.create_task(run_signups_compaction()))
+        if Config.BROADCAST_DELIVERY_RETENTION_DAYS:
+            tasks.append(asyncio.create_task(run_delivery_log_cleanup()))
+        if isinstance(dispatcher.storage, SQLAlchemyStorage):
+            tasks.append(asyncio.create_task(dispatcher.storage.run_cleanup()))
+    dispatcher["background_tasks"] = tasks
+    logger.info("Обработчики запуска выполнены за %.0f мс.", (time.perf_counter() - started) * 1000)
+
+
+async def on_shutdown(bot: Bot, dispatcher: Dispatcher):
+    """Общая остановка: рассылки сохраняют курсор, фоновые задачи отменяются, соединения закрываются."""
+    # Сначала фоновые задачи: цикл продолжения рассылок не должен запустить их снова
+    for task in dispatcher.workflow_data.pop("background_tasks", []):
+        task.cancel()
+    await stop_broadcast_jobs()
+    await close_http_session()
+    await bot.session.close()
+    logger.info("Обработчики остановки выполнены.")
@@ -0,0 +1,5 @@
+from .user_context import UserContextMiddleware  #middlewares/__init__.py
+from .metrics import MetricsMiddleware
+__all__ = ["UserContextMiddleware",
+           "MetricsMiddleware",
+           ]
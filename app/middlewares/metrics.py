@@ -0,0 +1,47 @@
+# app/middlewares/metrics.py
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery, TelegramObject
+from app.services.metrics import HandlerMetrics, metrics as default_metrics
+from app.utils.callback_dispatch import PREFIX_SEPARATOR
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware роутера: измеряет время выполнения найденного обработчика.
+
+    Сообщения помечаются именем функции-обработчика, callback-запросы — значением
+    callback_data до ":" (все кнопки роутера обслуживает один обработчик CallbackDispatcher,
+    а параметр после ":" дал бы неограниченное число меток).
+    """
+
+    def __init__(self, metrics: HandlerMetrics = None):
+        self.metrics = metrics or default_metrics
+
+    @staticmethod
+    def _label(event: TelegramObject, data: Dict[str, Any]) -> str:
+        if isinstance(event, CallbackQuery):
+            return (event.data or "").split(PREFIX_SEPARATOR, 1)[0] or "<empty>"
+        handler: HandlerObject = data.get("handler")
+        return handler.callback.__name__ if handler is not None else "<unknown>"
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = (data["event_update"].event_type, self._label(event, data))
+        self.metrics.started(key)
+        started = time.perf_counter()
+        error = None
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.metrics.finished(key, time.perf_counter() - started, error)
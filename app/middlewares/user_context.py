@@ -0,0 +1,52 @@
+# app/middlewares/user_context.py
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+from app.database.crud import get_user
+from app.database.db import get_async_session
+from app.database.user_cache import user_cache
+from app.utils.cache import MISSING
+
+logger = logging.getLogger(__name__)
+
+
+async def get_cached_user(user_id: int):
+    """
+    Возвращает пользователя из кэша, при промахе загружает его из базы.
+
+    Если во время загрузки запись сбросил upsert_user, загруженная строка могла устареть
+    и в кэш не кладётся.
+    """
+    db_user = user_cache.get(user_id)
+    if db_user is MISSING:
+        generation = user_cache.generation(user_id)
+        session = await get_async_session()
+        async with session:
+            db_user = await get_user(user_id, session)
+        if user_cache.generation(user_id) == generation:
+            user_cache.set(user_id, db_user)
+    return db_user
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Один раз на апдейт определяет запись пользователя из базы и передаёт её
+    обработчикам в аргументе `db_user` (None, если пользователь не зарегистрирован).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user: TelegramUser = data.get("event_from_user")
+        if from_user is not None:
+            try:
+                data["db_user"] = await get_cached_user(from_user.id)
+            except Exception as e:
+                logger.error("Ошибка при загрузке пользователя %s: %s", from_user.id, e)
+                data["db_user"] = None
+        return await handler(event, data)
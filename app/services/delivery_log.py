@@ -0,0 +1,62 @@
+# app/services/delivery_log.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from config import Config
+from app.database.crud import delete_old_broadcast_deliveries
+from app.database.db import get_async_session
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryLog:
+    """
+    Журнал доставки текущей пачки рассылки (таблица broadcast_deliveries).
+
+    `record` только добавляет строку в память и никогда не ждёт базу. Строки пачки
+    забирает `drain`, и checkpoint_broadcast_job пишет их в одной транзакции с курсором
+    и счётчиками. После сбоя незавершённая пачка отправляется повторно, и её строки
+    перезаписываются: журнал не теряет и не дублирует записи.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._buffer: List[dict] = []
+
+    def record(self, user_id: int, error: BaseException = None):
+        """Добавляет результат отправки получателю `user_id` (error=None — доставлено)."""
+        self._buffer.append({
+            "job_id": self.job_id,
+            "user_id": user_id,
+            "status": "failed" if error is not None else "sent",
+            "error": type(error).__name__ if error is not None else None,
+            "created_at": datetime.utcnow(),
+        })
+
+    def drain(self) -> List[dict]:
+        """Возвращает накопленные строки и очищает буфер."""
+        rows, self._buffer = self._buffer, []
+        return rows
+
+
+async def cleanup_delivery_log(days: int = None) -> int:
+    """Удаляет журнал доставки рассылок, завершённых больше `days` дней назад."""
+    days = Config.BROADCAST_DELIVERY_RETENTION_DAYS if days is None else days
+    session = await get_async_session()
+    async with session:
+        deleted = await delete_old_broadcast_deliveries(datetime.utcnow() - timedelta(days=days), session)
+    if deleted:
+        logger.info("Удалено записей журнала доставки: %s.", deleted)
+    return deleted
+
+
+async def run_delivery_log_cleanup(interval: float = 3600):
+    """Периодически удаляет устаревший журнал доставки рассылок."""
+    while True:
+        try:
+            await cleanup_delivery_log()
+        except Exception as e:
+            logger.error("Ошибка при очистке журнала доставки: %s", e)
+        await asyncio.sleep(interval)
@@ -0,0 +1,34 @@
+# app/services/http.py
+
+import logging
+from typing import Optional
+import aiohttp
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общий HTTP-клиент приложения с пулом соединений.
+
+    Создаётся при первом обращении и закрывается при остановке бота (close_http_session).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=Config.HTTP_CONNECTION_LIMIT, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=Config.HTTP_TIMEOUT),
+        )
+        logger.info("Создан общий HTTP-клиент.")
+    return _session
+
+
+async def close_http_session():
+    """Закрывает общий HTTP-клиент."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
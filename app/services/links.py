@@ -0,0 +1,37 @@
+# app/services/links.py
+
+from types import MappingProxyType
+from typing import Mapping
+from config import Config
+
+# Заголовки сообщений для отдельных категорий ссылок
+LINK_HEADERS = {
+    "contact_details": "Наши контакты:\n\n",
+}
+
+
+def render_links(links, header: str = "") -> str:
+    """Формирует Markdown-сообщение из списка ссылок и текстовых строк."""
+    lines = []
+    for link in links:
+        if "name" in link and "url" in link:
+            lines.append(f"{link['name']}: [ссылка]({link['url']})")
+        elif "text" in link:
+            lines.append(link["text"])
+    return header + "".join(f"{line}\n" for line in lines)
+
+
+def _build_link_messages() -> Mapping[str, str]:
+    return MappingProxyType({
+        category: render_links(links, LINK_HEADERS.get(category, ""))
+        for category, links in Config.LINKS.items()
+    })
+
+
+# Config.LINKS задаётся в коде, поэтому сообщения строятся один раз при импорте
+_link_messages = _build_link_messages()
+
+
+def get_link_message(category: str) -> str:
+    """Готовое сообщение со ссылками категории из Config.LINKS."""
+    return _link_messages[category]
@@ -0,0 +1,127 @@
+# app/services/media_cache.py
+
+import os
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Tuple
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from app.database.crud import delete_media_file_id, get_media_file_id, save_media_file_id
+from app.database.db import get_async_session
+from app.utils.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Фрагменты описаний TelegramBadRequest, означающих, что сохранённый file_id недействителен
+INVALID_FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file_id_invalid", "invalid file id")
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_invalid_file_id(error: TelegramBadRequest) -> bool:
+    """Отклонён ли сам file_id (а не запрос по другой причине, например «chat not found»)."""
+    text = str(error).lower()
+    return any(fragment in text for fragment in INVALID_FILE_ID_ERRORS)
+
+
+class MediaCache:
+    """
+    Кэш file_id Telegram для статических файлов из resources.
+
+    Файл загружается в Telegram один раз, полученный file_id сохраняется в памяти
+    и в таблице media_files по SHA-256 содержимого. Изменённый файл получает новый
+    хэш и загружается заново. Хэш пересчитывается только при изменении mtime или размера.
+    Одновременные первые отправки одного файла загружают его один раз (SingleFlight по хэшу):
+    остальные получатели ждут загрузки и получают файл по её file_id.
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._uploads = SingleFlight()
+
+    async def content_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        content_hash = await asyncio.to_thread(_hash_file, path)
+        self._hashes[path] = (stat.st_mtime, stat.st_size, content_hash)
+        return content_hash
+
+    async def _get_file_id(self, content_hash: str):
+        file_id = self._file_ids.get(content_hash)
+        if file_id is None:
+            session = await get_async_session()
+            async with session:
+                file_id = await get_media_file_id(content_hash, session)
+            if file_id:
+                self._file_ids[content_hash] = file_id
+        return file_id
+
+    async def _forget(self, content_hash: str):
+        self._file_ids.pop(content_hash, None)
+        session = await get_async_session()
+        async with session:
+            await delete_media_file_id(content_hash, session)
+
+    async def send_document(self, bot: Bot, chat_id: int, path: str, caption: str = None) -> Message:
+        """Отправляет файл по сохранённому file_id, а при его отсутствии — загружает и запоминает file_id."""
+        content_hash = await self.content_hash(path)
+
+        file_id = await self._get_file_id(content_hash)
+        if file_id:
+            try:
+                return await bot.send_document(chat_id=chat_id, document=file_id, caption=caption)
+            except TelegramBadRequest as e:
+                if not is_invalid_file_id(e):
+                    raise
+                logger.warning("Сохранённый file_id для %s отклонён Telegram, файл будет загружен заново: %s", path, e)
+                await self._forget(content_hash)
+
+        # Одновременные первые отправки загружают файл один раз. Если загрузка для другого
+        # получателя не удалась (например, его чат недоступен), вызов повторяет её сам.
+        for attempt in range(2):
+            uploaded = {}
+            try:
+                file_id = await self._uploads.do(
+                    content_hash, lambda: self._upload(bot, chat_id, path, caption, content_hash, uploaded)
+                )
+            except Exception:
+                if "message" in uploaded or attempt:
+                    raise
+                continue
+            if "message" in uploaded:
+                return uploaded["message"]
+            if file_id:
+                return await bot.send_document(chat_id=chat_id, document=file_id, caption=caption)
+            break
+        return await bot.send_document(chat_id=chat_id, document=FSInputFile(path), caption=caption)
+
+    async def _upload(self, bot: Bot, chat_id: int, path: str, caption: str, content_hash: str, uploaded: dict):
+        """Загружает файл получателю `chat_id` (сообщение — в uploaded["message"]) и запоминает file_id."""
+        uploaded["message"] = None
+        message = await bot.send_document(chat_id=chat_id, document=FSInputFile(path), caption=caption)
+        uploaded["message"] = message
+        if not message.document:
+            return None
+        self._file_ids[content_hash] = message.document.file_id
+        try:
+            session = await get_async_session()
+            async with session:
+                await save_media_file_id(content_hash, path, message.document.file_id, session)
+            logger.info("Файл %s загружен в Telegram, file_id сохранён.", path)
+        except Exception as e:
+            logger.error("Не удалось сохранить file_id для %s: %s", path, e)
+        return message.document.file_id
+
+
+media_cache = MediaCache()
@@ -0,0 +1,154 @@
+# app/services/metrics.py
+
+import bisect
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from app.database.db import get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек (сек.)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Метка обработчика: (тип события, имя обработчика или префикс callback_data)
+HandlerKey = Tuple[str, str]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как histogram в Prometheus)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя корзина — +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class HandlerMetrics:
+    """Задержки, ошибки и число выполняющихся вызовов по обработчикам (в пределах процесса)."""
+
+    def __init__(self):
+        self.latency: Dict[HandlerKey, Histogram] = defaultdict(Histogram)
+        self.errors: Counter = Counter()  # (event, handler, класс ошибки) -> число
+        self.in_flight: Counter = Counter()
+
+    def started(self, key: HandlerKey):
+        self.in_flight[key] += 1
+
+    def finished(self, key: HandlerKey, duration: float, error: Optional[BaseException] = None):
+        self.in_flight[key] -= 1
+        self.latency[key].observe(duration)
+        if error is not None:
+            self.errors[(*key, type(error).__name__)] += 1
+
+    def render_prometheus(self) -> str:
+        """Текст в формате Prometheus exposition."""
+        lines: List[str] = [
+            "# HELP bot_handler_duration_seconds Время выполнения обработчика.",
+            "# TYPE bot_handler_duration_seconds histogram",
+        ]
+        for (event, handler), histogram in sorted(self.latency.items()):
+            labels = f'event="{event}",handler="{_escape(handler)}"'
+            cumulative = 0
+            for bound, bucket_count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'bot_handler_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"bot_handler_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"bot_handler_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP bot_handler_errors_total Исключения, вышедшие из обработчика.",
+            "# TYPE bot_handler_errors_total counter",
+        ]
+        for (event, handler, error), count in sorted(self.errors.items()):
+            lines.append(
+                f'bot_handler_errors_total{{event="{event}",handler="{_escape(handler)}",error="{error}"}} {count}'
+            )
+
+        lines += [
+            "# HELP bot_handler_in_flight Обработчики, выполняющиеся в данный момент.",
+            "# TYPE bot_handler_in_flight gauge",
+        ]
+        for (event, handler), count in sorted(self.in_flight.items()):
+            lines.append(f'bot_handler_in_flight{{event="{event}",handler="{_escape(handler)}"}} {count}')
+
+        for name, value in get_pool_stats().items():
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE bot_db_pool_{name} gauge")
+                lines.append(f"bot_db_pool_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self, limit: int = 15) -> str:
+        """Сводка для админ-панели: самые медленные обработчики по p95."""
+        if not self.latency:
+            return "Метрик пока нет: с момента запуска не было обработанных событий."
+
+        errors_by_handler: Counter = Counter()
+        for (event, handler, _), count in self.errors.items():
+            errors_by_handler[(event, handler)] += count
+
+        rows = sorted(self.latency.items(), key=lambda item: item[1].quantile(0.95), reverse=True)
+        lines = ["Обработчики (по убыванию p95):"]
+        for (event, handler), histogram in rows[:limit]:
+            kind = "кнопка" if event == "callback_query" else "сообщение"
+            line = (
+                f"• {handler} ({kind}): {histogram.count} выз., "
+                f"p50 ≈ {histogram.quantile(0.5) * 1000:.0f} мс, p95 ≈ {histogram.quantile(0.95) * 1000:.0f} мс"
+            )
+            if errors_by_handler[(event, handler)]:
+                line += f", ошибок: {errors_by_handler[(event, handler)]}"
+            lines.append(line)
+
+        lines.append(f"\nВыполняется сейчас: {sum(self.in_flight.values())}")
+        pool = get_pool_stats()
+        if "checked_out" in pool:
+            lines.append(
+                f"Пул БД: занято {pool['checked_out']} из {pool['size']} (+{pool['overflow']} сверх лимита)"
+                + (f", среднее ожидание {pool['acquire_time_avg_ms']} мс" if "acquire_time_avg_ms" in pool else "")
+            )
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+metrics = HandlerMetrics()
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """GET /metrics для Prometheus."""
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Отдельный от webhook HTTP-сервер с /metrics (host — Config.METRICS_HOST)."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info("Метрики доступны на %s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,410 @@
+# app/services/newsletter.py
+
+import os
+import socket
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from config import Config
+from app.database.crud import (
+    checkpoint_broadcast_job,
+    claim_broadcast_job,
+    get_broadcast_job,
+    iter_recipient_batches,
+    get_running_broadcast_job_ids,
+    release_broadcast_job,
+    renew_broadcast_lease,
+    set_broadcast_job_status,
+)
+from app.database.db import get_async_session
+from app.services.delivery_log import DeliveryLog
+from app.services.staff import staff_registry, is_staff_in
+
+logger = logging.getLogger(__name__)
+
+SendFunc = Callable[[int], Awaitable[object]]
+# Результат отправки получателю: (chat_id, исключение или None при успехе)
+ResultFunc = Callable[[int, Optional[BaseException]], None]
+
+
+class TokenBucket:
+    """
+    Глобальный ограничитель скорости отправки.
+
+    Токены пополняются со скоростью `rate` в секунду, запас не превышает `capacity`.
+    `pause()` останавливает выдачу токенов для всех отправителей (ответ 429 от Telegram
+    относится ко всему боту, а не к отдельному чату).
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = None
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self._updated_at is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def pause(self, seconds: float):
+        """Приостанавливает выдачу токенов на `seconds` секунд."""
+        loop = asyncio.get_running_loop()
+        self._paused_until = max(self._paused_until, loop.time() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        """Ожидает и забирает один токен."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Общий ограничитель всех рассылок процесса (создаётся при первой рассылке)
+_shared_bucket: Optional[TokenBucket] = None
+
+
+def get_broadcast_bucket() -> TokenBucket:
+    """Возвращает общий для всех рассылок TokenBucket на BROADCAST_RATE_LIMIT отправок в секунду."""
+    global _shared_bucket
+    if _shared_bucket is None:
+        _shared_bucket = TokenBucket(Config.BROADCAST_RATE_LIMIT)
+    return _shared_bucket
+
+
+@dataclass
+class BroadcastStats:
+    """Итоги рассылки: успешные отправки, ошибки по классам и повторы."""
+    sent: int = 0
+    failed: int = 0
+    errors: Counter = field(default_factory=Counter)
+    retries: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "BroadcastStats"):
+        self.sent += other.sent
+        self.failed += other.failed
+        self.errors.update(other.errors)
+        self.retries.update(other.retries)
+
+    def format_errors(self) -> str:
+        """Строка вида 'TelegramForbiddenError: 3, TelegramBadRequest: 1'."""
+        return ", ".join(f"{name}: {count}" for name, count in self.errors.most_common())
+
+
+class BroadcastEngine:
+    """
+    Отправка рассылки с ограниченной параллельностью и глобальным лимитом скорости.
+
+    `send` — корутина, отправляющая сообщение одному получателю по chat_id.
+    TelegramRetryAfter приостанавливает всю рассылку на `retry_after` секунд и
+    повторяет отправку; сетевые и серверные ошибки повторяются с задержкой;
+    блокировка бота и неверный чат считаются окончательной ошибкой.
+    `on_result` (синхронный, не должен ждать ввода-вывода) получает итог по каждому получателю.
+    Без `rate_limit` все движки делят общий ограничитель: одновременные рассылки вместе
+    не превышают BROADCAST_RATE_LIMIT, а пауза после 429 останавливает их все.
+    """
+
+    def __init__(
+        self,
+        send: SendFunc,
+        concurrency: int = None,
+        rate_limit: float = None,
+        max_retries: int = None,
+        on_result: ResultFunc = None,
+    ):
+        self.send = send
+        self.on_result = on_result
+        self.concurrency = concurrency or Config.BROADCAST_CONCURRENCY
+        self.bucket = TokenBucket(rate_limit) if rate_limit else get_broadcast_bucket()
+        self.max_retries = Config.BROADCAST_MAX_RETRIES if max_retries is None else max_retries
+
+    async def run(self, chat_ids: Iterable[int]) -> BroadcastStats:
+        """Отправляет сообщение всем получателям и возвращает статистику."""
+        stats = BroadcastStats()
+        recipients = iter(chat_ids)
+
+        async def worker():
+            # Воркеры разбирают общий итератор, поэтому задач ровно `concurrency`,
+            # независимо от размера аудитории.
+            for chat_id in recipients:
+                await self._deliver(chat_id, stats)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return stats
+
+    async def _deliver(self, chat_id: int, stats: BroadcastStats) -> bool:
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                await self.send(chat_id)
+            except TelegramRetryAfter as e:
+                logger.warning("Flood control при отправке %s: пауза %s с.", chat_id, e.retry_after)
+                stats.retries[type(e).__name__] += 1
+                self.bucket.pause(e.retry_after)
+                error = e
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning("Временная ошибка при отправке %s: %s", chat_id, e)
+                stats.retries[type(e).__name__] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+                error = e
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.info("Получатель %s недоступен: %s", chat_id, e)
+                error = e
+                break
+            except Exception as e:
+                logger.error("Не удалось отправить сообщение пользователю %s: %s", chat_id, e)
+                error = e
+                break
+            else:
+                # Вне try: ошибка в on_result не должна приводить к повторной отправке
+                stats.sent += 1
+                self._report(chat_id, None)
+                return True
+
+        stats.failed += 1
+        stats.errors[type(error).__name__] += 1
+        self._report(chat_id, error)
+        return False
+
+    def _report(self, chat_id: int, error: Optional[BaseException]):
+        """Передаёт итог в on_result; ошибка обработчика не прерывает рассылку."""
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(chat_id, error)
+        except Exception as e:
+            logger.error("Ошибка обработчика результата отправки для %s: %s", chat_id, e)
+
+
+# Запущенные задания рассылки: job_id -> задача
+_running_jobs: Dict[int, asyncio.Task] = {}
+
+# Владелец аренды рассылок в broadcast_jobs.owner
+INSTANCE_ID = (Config.INSTANCE_ID or f"{socket.gethostname()}:{os.getpid()}")[:64]
+
+
+class BroadcastLeaseLost(Exception):
+    """Аренда рассылки перешла к другому экземпляру бота."""
+
+
+def start_broadcast_job(bot: Bot, job_id: int) -> asyncio.Task:
+    """Запускает задание рассылки в фоне (повторный запуск того же задания игнорируется)."""
+    task = _running_jobs.get(job_id)
+    if task and not task.done():
+        return task
+    task = asyncio.create_task(run_broadcast_job(bot, job_id), name=f"broadcast-job-{job_id}")
+    _running_jobs[job_id] = task
+    task.add_done_callback(lambda t: _running_jobs.pop(job_id, None))
+    return task
+
+
+async def run_broadcast_job(bot: Bot, job_id: int):
+    """
+    Выполняет задание рассылки с его контрольной точки.
+
+    Получатели выбираются пачками по возрастанию ID, после каждой пачки курсор и
+    счётчики сохраняются в базе. После перезапуска повторно отправляется не больше
+    одной незавершённой пачки. Рассылку выполняет только экземпляр, захвативший её аренду;
+    аренда продлевается и во время отправки пачки, а при её потере отправка прерывается.
+    При ошибке рассылка помечается как failed, автор получает уведомление.
+    """
+    session = await get_async_session()
+    async with session:
+        job = await get_broadcast_job(job_id, session)
+        if job is None or job.status != "running":
+            logger.warning("Задание рассылки %s не найдено или уже завершено.", job_id)
+            return
+        if not await claim_broadcast_job(job_id, INSTANCE_ID, Config.BROADCAST_LEASE_SECONDS, session):
+            logger.info("Рассылка #%s выполняется другим экземпляром бота.", job_id)
+            return
+
+    logger.info("Рассылка #%s (%s) выполняется с курсора %s.", job_id, job.client_type, job.last_user_id)
+
+    async def send(chat_id: int):
+        await bot.copy_message(chat_id=chat_id, from_chat_id=job.from_chat_id, message_id=job.message_id)
+
+    # Журнал доставки копится в памяти и пишется вместе с контрольной точкой пачки
+    delivery_log = DeliveryLog(job_id)
+    engine = BroadcastEngine(send, on_result=delivery_log.record)
+    stats = BroadcastStats()
+    cursor = job.last_user_id
+
+    try:
+        session = await get_async_session()
+        async with session:
+            batches = iter_recipient_batches(
+                job.client_type, Config.BROADCAST_CHECKPOINT_EVERY, session, after_id=cursor
+            )
+            async for batch in batches:
+                staff_ids, staff_usernames = staff_registry.snapshot()
+                recipients = [
+                    user_id for user_id, username in batch
+                    if not is_staff_in(staff_ids, staff_usernames, user_id=user_id, username=username)
+                ]
+                batch_stats = await _run_with_lease(job_id, engine.run(recipients))
+                stats.merge(batch_stats)
+                cursor = batch[-1][0]
+                if not await checkpoint_broadcast_job(
+                    job_id, cursor, batch_stats.sent, batch_stats.failed, session,
+                    owner=INSTANCE_ID, lease_seconds=Config.BROADCAST_LEASE_SECONDS,
+                    deliveries=delivery_log.drain(),
+                ):
+                    raise BroadcastLeaseLost()
+
+            await set_broadcast_job_status(job_id, "done", session)
+            job = await get_broadcast_job(job_id, session)
+    except asyncio.CancelledError:
+        logger.info("Рассылка #%s остановлена на курсоре %s, будет продолжена после перезапуска.", job_id, cursor)
+        await _release_job(job_id)
+        raise
+    except BroadcastLeaseLost:
+        logger.warning("Аренда рассылки #%s перешла к другому экземпляру, рассылка здесь остановлена.", job_id)
+        return
+    except Exception as e:
+        logger.error("Ошибка при выполнении рассылки #%s: %s", job_id, e)
+        await _fail_job(bot, job, cursor, e)
+        return
+
+    report = f"Рассылка #{job_id} завершена. Успешно: {job.sent_count}, Ошибок: {job.failed_count}."
+    if stats.errors:
+        report += f"\nОшибки по типам: {stats.format_errors()}"
+    if stats.retries:
+        report += f"\nПовторных попыток: {sum(stats.retries.values())}"
+    report += f"\nПодробности: /broadcast_report {job_id}"
+    logger.info("%s Ошибки: %s, повторы: %s", report, dict(stats.errors), dict(stats.retries))
+    try:
+        await bot.send_message(job.created_by, report)
+    except Exception as e:
+        logger.error("Не удалось отправить отчёт о рассылке #%s: %s", job_id, e)
+
+
+async def _run_with_lease(job_id: int, awaitable: Awaitable):
+    """
+    Выполняет отправку пачки, продлевая аренду рассылки в фоне.
+
+    Пачка с долгими паузами после 429 может идти дольше BROADCAST_LEASE_SECONDS: без продления
+    аренду захватил бы другой экземпляр и отправил ту же пачку повторно. Если аренду
+    продлить не удалось, отправка прерывается исключением BroadcastLeaseLost.
+    """
+    work = asyncio.ensure_future(awaitable)
+    heartbeat = asyncio.create_task(_keep_lease(job_id), name=f"broadcast-lease-{job_id}")
+    try:
+        done, _ = await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        if work in done:
+            return work.result()
+        raise BroadcastLeaseLost()
+    finally:
+        work.cancel()
+        heartbeat.cancel()
+        await asyncio.gather(work, heartbeat, return_exceptions=True)
+
+
+async def _keep_lease(job_id: int):
+    """
+    Продлевает аренду каждую треть её срока; возвращается, когда аренда потеряна.
+
+    Аренда считается потерянной, если она перешла к другому экземпляру или продлить её
+    не удавалось (база недоступна) и до её истечения осталось меньше одного интервала.
+    """
+    loop = asyncio.get_running_loop()
+    lease_seconds = Config.BROADCAST_LEASE_SECONDS
+    interval = max(lease_seconds / 3, 1)
+    # Аренда только что захвачена или продлена контрольной точкой предыдущей пачки
+    deadline = loop.time() + lease_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            session = await get_async_session()
+            async with session:
+                if not await renew_broadcast_lease(job_id, INSTANCE_ID, lease_seconds, session):
+                    return
+            deadline = loop.time() + lease_seconds
+        except Exception as e:
+            logger.warning("Не удалось продлить аренду рассылки #%s: %s", job_id, e)
+            if deadline - loop.time() <= interval:
+                return
+
+
+async def _release_job(job_id: int):
+    """Снимает аренду остановленной рассылки, чтобы её сразу мог продолжить другой экземпляр."""
+    try:
+        session = await get_async_session()
+        async with session:
+            await release_broadcast_job(job_id, INSTANCE_ID, session)
+    except Exception as e:
+        logger.error("Не удалось снять аренду рассылки #%s: %s", job_id, e)
+
+
+async def _fail_job(bot: Bot, job, cursor: int, error: Exception):
+    """Помечает рассылку как failed (без повторов после перезапуска) и уведомляет её автора."""
+    try:
+        session = await get_async_session()
+        async with session:
+            await set_broadcast_job_status(job.id, "failed", session)
+    except Exception as e:
+        logger.error("Не удалось отметить рассылку #%s как failed: %s", job.id, e)
+    try:
+        await bot.send_message(
+            job.created_by,
+            f"Рассылка #{job.id} прервана из-за ошибки ({type(error).__name__}) "
+            f"после получателя {cursor}.\nПодробности: /broadcast_report {job.id}",
+        )
+    except Exception as e:
+        logger.error("Не удалось отправить уведомление об ошибке рассылки #%s: %s", job.id, e)
+
+
+async def resume_broadcast_jobs(bot: Bot):
+    """Продолжает свободные незавершённые рассылки: без владельца или с истёкшей арендой."""
+    session = await get_async_session()
+    async with session:
+        job_ids = await get_running_broadcast_job_ids(session, unowned_at=datetime.utcnow())
+    job_ids = [job_id for job_id in job_ids if job_id not in _running_jobs]
+    for job_id in job_ids:
+        logger.info("Продолжаем незавершённую рассылку #%s.", job_id)
+        start_broadcast_job(bot, job_id)
+    return job_ids
+
+
+async def run_broadcast_resume(bot: Bot):
+    """
+    Периодически подхватывает свободные рассылки.
+
+    Сразу после запуска — прерванные перезапуском; затем — рассылки, чей владелец остановился
+    без снятия аренды (её срок истёк) или снял её, пока этот экземпляр уже работал.
+    """
+    while True:
+        try:
+            await resume_broadcast_jobs(bot)
+        except Exception as e:
+            logger.error("Ошибка при продолжении рассылок: %s", e)
+        await asyncio.sleep(max(Config.BROADCAST_LEASE_SECONDS / 2, 1))
+
+
+async def stop_broadcast_jobs():
+    """Останавливает запущенные рассылки; их курсоры остаются в базе."""
+    tasks = list(_running_jobs.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
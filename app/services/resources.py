@@ -0,0 +1,66 @@
+# app/services/resources.py
+
+import time
+import logging
+from typing import Dict, Optional, Tuple
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+FILE_NOT_FOUND_TEXT = "Файл не найден."
+FILE_ERROR_TEXT = "Ошибка при загрузке файла."
+
+
+class ResourceStore:
+    """
+    Текстовые ресурсы (правила, инструкция по прибытии и т. п.) в памяти.
+
+    Файлы читаются асинхронно через aiofiles, поэтому обработчики не блокируют цикл событий.
+    Актуальность проверяется по mtime не чаще, чем раз в `check_interval` секунд;
+    invalidate() сбрасывает кэш по команде администратора.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        # path -> (mtime, текст, время последней проверки)
+        self._entries: Dict[str, Tuple[float, str, float]] = {}
+
+    async def get_text(self, path: str) -> str:
+        """Возвращает содержимое текстового файла."""
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry and now - entry[2] < self.check_interval:
+            return entry[1]
+
+        try:
+            stat = await aiofiles.os.stat(path)
+        except FileNotFoundError:
+            logger.warning("Файл %s не найден.", path)
+            self._entries.pop(path, None)
+            return FILE_NOT_FOUND_TEXT
+
+        if entry and entry[0] == stat.st_mtime:
+            self._entries[path] = (entry[0], entry[1], now)
+            return entry[1]
+
+        try:
+            async with aiofiles.open(path, "r", encoding="utf-8") as f:
+                text = await f.read()
+        except Exception as e:
+            logger.error("Ошибка при загрузке текста из %s: %s", path, e)
+            return FILE_ERROR_TEXT
+
+        self._entries[path] = (stat.st_mtime, text, now)
+        logger.info("Текст из %s загружен.", path)
+        return text
+
+    def invalidate(self, path: Optional[str] = None):
+        """Сбрасывает кэш одного файла или всех файлов."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+
+
+resource_store = ResourceStore()
@@ -0,0 +1,35 @@
+# app/services/signups.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from config import Config
+from app.database.crud import rebuild_daily_signups
+from app.database.db import get_async_session
+
+logger = logging.getLogger(__name__)
+
+
+async def compact_daily_signups(days: int = None):
+    """Пересчитывает сводку регистраций за последние `days` дней."""
+    days = Config.SIGNUPS_COMPACTION_DAYS if days is None else days
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    session = await get_async_session()
+    async with session:
+        await rebuild_daily_signups(session, since=since)
+    logger.info("Сводка регистраций пересчитана с %s.", since)
+
+
+async def run_signups_compaction():
+    """
+    Периодически пересчитывает последние дни сводки регистраций.
+
+    Сводка обновляется инкрементально при записи, а фоновый пересчёт исправляет
+    расхождения (например, после смены типа клиента) и закрывает прошедшие дни.
+    """
+    while True:
+        try:
+            await compact_daily_signups()
+        except Exception as e:
+            logger.error("Ошибка при пересчёте сводки регистраций: %s", e)
+        await asyncio.sleep(Config.SIGNUPS_COMPACTION_INTERVAL)
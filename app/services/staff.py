@@ -0,0 +1,106 @@
+# app/services/staff.py
+
+import os
+import time
+import logging
+from typing import FrozenSet, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def parse_staff_entries(lines) -> Tuple[FrozenSet[int], FrozenSet[str]]:
+    """
+    Разбирает строки файла сотрудников в множества ID и username.
+
+    Каждая строка может содержать ID, username (с @) или оба значения в любом порядке.
+    """
+    ids = set()
+    usernames = set()
+    for line in lines:
+        for part in line.split():
+            if part.startswith("@"):
+                usernames.add(part.lower())
+            elif part.isdigit():
+                ids.add(int(part))
+            else:
+                logger.warning("Некорректная запись в списке сотрудников: %r", part)
+    return frozenset(ids), frozenset(usernames)
+
+
+class StaffRegistry:
+    """
+    Реестр сотрудников в памяти.
+
+    Файл разбирается один раз в множества ID и username, проверка выполняется за O(1).
+    Файл перечитывается только при изменении mtime, а сам mtime проверяется
+    не чаще, чем раз в `check_interval` секунд.
+    """
+
+    def __init__(self, file_path: str, check_interval: float = 5.0):
+        self.file_path = file_path
+        self.check_interval = check_interval
+        self._ids: FrozenSet[int] = frozenset()
+        self._usernames: FrozenSet[str] = frozenset()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def _revalidate(self):
+        """Перечитывает файл, если он изменился с момента последней загрузки."""
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.file_path).st_mtime
+        except FileNotFoundError:
+            if self._mtime != -1:
+                logger.error("Файл %s не найден.", self.file_path)
+            self._ids, self._usernames, self._mtime = frozenset(), frozenset(), -1
+            return
+
+        if mtime == self._mtime:
+            return
+        self.reload(mtime)
+
+    def reload(self, mtime: Optional[float] = None):
+        """Принудительно загружает список сотрудников из файла."""
+        try:
+            if mtime is None:
+                mtime = os.stat(self.file_path).st_mtime
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                ids, usernames = parse_staff_entries(f.read().splitlines())
+        except Exception as e:
+            logger.error("Ошибка при загрузке списка сотрудников: %s", e)
+            return
+        self._ids, self._usernames, self._mtime = ids, usernames, mtime
+        self._checked_at = time.monotonic()
+        logger.info("Список сотрудников загружен: %s ID, %s username.", len(ids), len(usernames))
+
+    def snapshot(self) -> Tuple[FrozenSet[int], FrozenSet[str]]:
+        """Возвращает актуальные множества ID и username для массовых проверок."""
+        self._revalidate()
+        return self._ids, self._usernames
+
+    def contains(self, user_id: int = None, username: str = None) -> bool:
+        """Проверяет, является ли пользователь сотрудником."""
+        if not user_id and not username:
+            return False
+        ids, usernames = self.snapshot()
+        return is_staff_in(ids, usernames, user_id, username)
+
+
+def is_staff_in(ids: FrozenSet[int], usernames: FrozenSet[str], user_id: int = None, username: str = None) -> bool:
+    """Проверка по заранее полученному снимку реестра."""
+    if user_id and user_id in ids:
+        return True
+    if username:
+        username = username.lower()
+        if not username.startswith("@"):
+            username = "@" + username
+        return username in usernames
+    return False
+
+
+staff_registry = StaffRegistry(Config.STAFF_USERNAMES_FILE)
@@ -0,0 +1,59 @@
+# app/services/weather.py
+
+import asyncio
+import logging
+import aiohttp
+from config import Config
+from app.services.http import get_http_session
+from app.utils.cache import TTLCache, SingleFlight, MISSING
+
+logger = logging.getLogger(__name__)
+
+WEATHER_UNAVAILABLE_MESSAGE = "Не удалось получить данные о погоде. Попробуйте позже."
+# Неудачный ответ кэшируется ненадолго, чтобы не заваливать недоступный сервис запросами
+WEATHER_FAILURE_TTL = 30
+
+_weather_cache = TTLCache(maxsize=1, ttl=Config.WEATHER_CACHE_TTL)
+_weather_flight = SingleFlight()
+
+
+async def get_weather() -> str:
+    """
+    Возвращает описание текущей погоды в Сочи.
+
+    Ответ кэшируется на WEATHER_CACHE_TTL секунд; одновременные запросы при пустом
+    кэше объединяются в один запрос к open-meteo.
+    """
+    cached = _weather_cache.get("current")
+    if cached is not MISSING:
+        return cached
+    return await _weather_flight.do("current", _fetch_weather)
+
+
+async def _fetch_weather() -> str:
+    session = get_http_session()
+    try:
+        async with session.get(
+            Config.WEATHER_API_URL, timeout=aiohttp.ClientTimeout(total=Config.WEATHER_TIMEOUT)
+        ) as response:
+            if response.status != 200:
+                logger.warning("Сервис погоды вернул статус %s.", response.status)
+                _weather_cache.set("current", WEATHER_UNAVAILABLE_MESSAGE, ttl=WEATHER_FAILURE_TTL)
+                return WEATHER_UNAVAILABLE_MESSAGE
+            data = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("Ошибка при запросе погоды: %r", e)
+        _weather_cache.set("current", WEATHER_UNAVAILABLE_MESSAGE, ttl=WEATHER_FAILURE_TTL)
+        return WEATHER_UNAVAILABLE_MESSAGE
+
+    # Получаем необходимые данные
+    temp = data["current_weather"]["temperature"]
+    windspeed = data["current_weather"]["windspeed"]
+    weather_code = data["current_weather"]["weathercode"]
+
+    # Преобразуем weathercode в описание на русском
+    weather_description_ru = Config.WEATHER_CODES.get(weather_code, "Неизвестная погода")
+
+    weather_text = f"Сейчас в Сочи: {temp}°C, {weather_description_ru}, скорость ветра: {windspeed} км/ч."
+    _weather_cache.set("current", weather_text)
+    return weather_text
@@ -0,0 +1,90 @@
+# app/utils/cache.py
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Отличает «нет в кэше» от закэшированного None
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    При переполнении вытесняется давно не использованная запись,
+    устаревшие записи удаляются при обращении к ним.
+
+    `generation(key)` меняется при каждом `invalidate(key)`: загрузка, начатая до сброса,
+    сравнивает поколение перед записью и не кладёт в кэш устаревшее значение.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Поколения сброшенных ключей (ограничены maxsize); для вытесненных и прочих
+        # ключей действует _generation_floor — не меньше любого вытесненного поколения
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._generation_counter = 0
+        self._generation_floor = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Возвращает значение или `default`, если записи нет или она устарела."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Сохраняет значение; `ttl` переопределяет время жизни по умолчанию."""
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Удаляет запись из кэша и меняет поколение ключа."""
+        self._data.pop(key, None)
+        self._generation_counter += 1
+        self._generations[key] = self._generation_counter
+        self._generations.move_to_end(key)
+        while len(self._generations) > self.maxsize:
+            _, evicted = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, evicted)
+
+    def generation(self, key: Hashable) -> int:
+        """Текущее поколение ключа (см. invalidate)."""
+        return self._generations.get(key, self._generation_floor)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы загрузчика с одним ключом в один.
+
+    Пока загрузка выполняется, остальные вызовы ждут её результата. Загрузка
+    идёт в отдельной задаче, поэтому отмена одного ожидающего не прерывает её для других.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
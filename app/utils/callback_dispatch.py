@@ -0,0 +1,71 @@
+# app/utils/callback_dispatch.py
+
+import logging
+from typing import Any, Callable, Dict, Optional, Set
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# Разделитель префикса и параметра в callback_data ("client_type:organizer")
+PREFIX_SEPARATOR = ":"
+
+
+class CallbackDispatcher:
+    """
+    Таблица маршрутизации callback-запросов роутера.
+
+    Вместо цепочки обработчиков с lambda-фильтрами, каждый из которых проверяется
+    по очереди, роутер получает один обработчик, который находит нужную функцию
+    по callback_data в словаре: точное совпадение или префикс до ":".
+    Повторная регистрация одного и того же значения (в любом роутере) — ошибка при запуске.
+    """
+
+    # Все зарегистрированные значения и префиксы во всех таблицах
+    _registered: Set[str] = set()
+
+    def __init__(self, router: Router):
+        self.router = router
+        self._exact: Dict[str, CallableObject] = {}
+        self._prefixes: Dict[str, CallableObject] = {}
+        router.callback_query.register(self._dispatch, self._match)
+
+    def _add(self, table: Dict[str, CallableObject], key: str, handler: CallableObject):
+        registry_key = key + PREFIX_SEPARATOR if table is self._prefixes else key
+        if registry_key in CallbackDispatcher._registered:
+            raise ValueError(f"Повторная регистрация обработчика для callback_data {registry_key!r}")
+        CallbackDispatcher._registered.add(registry_key)
+        table[key] = handler
+
+    def register(self, *data: str, prefix: Optional[str] = None) -> Callable:
+        """
+        Декоратор: регистрирует обработчик для одного или нескольких значений callback_data
+        и/или для префикса (`prefix="client_type"` обрабатывает "client_type:<значение>").
+        """
+        def decorator(callback: Callable) -> Callable:
+            handler = CallableObject(callback=callback)
+            for value in data:
+                self._add(self._exact, value, handler)
+            if prefix is not None:
+                self._add(self._prefixes, prefix, handler)
+            return callback
+        return decorator
+
+    def resolve(self, data: Optional[str]) -> Optional[CallableObject]:
+        """Находит обработчик для callback_data за O(1)."""
+        if not data:
+            return None
+        handler = self._exact.get(data)
+        if handler is None and PREFIX_SEPARATOR in data:
+            handler = self._prefixes.get(data.split(PREFIX_SEPARATOR, 1)[0])
+        return handler
+
+    async def _match(self, callback_query: CallbackQuery):
+        handler = self.resolve(callback_query.data)
+        if handler is None:
+            return False
+        return {"callback_handler": handler}
+
+    async def _dispatch(self, callback_query: CallbackQuery, callback_handler: CallableObject, **data: Any):
+        return await callback_handler.call(callback_query, **data)
@@ -0,0 +1,142 @@
+# app/utils/logging_config.py
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+from config import Config
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra= и выводится как поля записи
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON (UTF-8 без экранирования кириллицы)."""
+
+    default_time_format = "%Y-%m-%dT%H:%M:%S"
+    default_msec_format = "%s.%03d"
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Записи вида: ts=... level=INFO logger=app.handlers.common msg="..." user_id=42."""
+
+    default_time_format = JsonFormatter.default_time_format
+    default_msec_format = JsonFormatter.default_msec_format
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        line = " ".join(f"{key}={self._quote(value)}" for key, value in fields.items())
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+    @staticmethod
+    def _quote(value) -> str:
+        value = str(value)
+        if not value or any(char in value for char in ' "='):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+
+class _PreparingQueueHandler(QueueHandler):
+    """
+    Кладёт запись в очередь, подставив аргументы сообщения и текст исключения.
+
+    Аргументы могут измениться после возврата из вызова логгера, поэтому сообщение
+    собирается сразу; форматирование в JSON/key-value и запись в файл и консоль
+    выполняет поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    level: str = None,
+    log_format: str = None,
+    log_file: str = None,
+) -> QueueListener:
+    """
+    Настраивает логирование приложения (повторные вызовы ничего не меняют).
+
+    Вызовы логгеров только ставят запись в очередь; вывод в консоль и в файл
+    с ротацией (UTF-8) выполняется в отдельном потоке. Формат — LOG_FORMAT:
+    "kv" (ключ=значение) или "json".
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or Config.LOG_LEVEL).upper()
+    log_format = log_format or Config.LOG_FORMAT
+    log_file = Config.LOG_FILE if log_file is None else log_file
+
+    formatter = JsonFormatter() if log_format == "json" else KeyValueFormatter()
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            log_file,
+            maxBytes=Config.LOG_MAX_BYTES,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_PreparingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    # Журнал каждого HTTP-запроса к webhook не нужен: обновления и так логирует aiogram
+    logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Дописывает оставшиеся в очереди записи и останавливает поток логирования."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,41 @@
+# app/utils/timing.py
+
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """
+    Длительность этапов запуска для сводки в логе.
+
+    Этапы могут выполняться одновременно (через `run` внутри asyncio.gather),
+    поэтому сумма этапов может превышать общее время.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Ожидает `awaitable` и записывает длительность как этап `name`."""
+        with self.phase(name):
+            return await awaitable
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in self.phases.items())
+        return f"{self.elapsed * 1000:.0f} мс ({parts})"
@@ -0,0 +1,272 @@
+# app/workers.py
+
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import os
+import signal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import aiohttp
+from aiohttp import web
+from aiogram import Bot
+from config import Config
+from app.database.db import close_db
+from app.main import create_bot, create_dispatcher, set_webhook
+from app.services.http import close_http_session, get_http_session
+from app.services.metrics import start_metrics_server
+from app.utils.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+Update = Dict[str, Any]
+
+
+def shard_key(update: Update) -> int:
+    """
+    Ключ привязки обновления к воркеру: ID пользователя, иначе ID чата, иначе update_id.
+
+    Все обновления одного пользователя попадают в один процесс, поэтому его состояние FSM,
+    кэши и порядок обработки остаются согласованными.
+    """
+    for name, payload in update.items():
+        if name == "update_id" or not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+class KeyedTaskRunner:
+    """
+    Параллельная обработка с сохранением порядка внутри ключа.
+
+    Обновления разных пользователей обрабатываются одновременно (не больше `max_in_flight`),
+    обновления одного пользователя — строго по очереди.
+    """
+
+    def __init__(self, handle: Callable[[Update], Awaitable[Any]], max_in_flight: int):
+        self._handle = handle
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tails: Dict[int, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, key: int, update: Update):
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(self._tails.get(key), update))
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._done(key, t))
+
+    async def _run(self, previous: Optional[asyncio.Task], update: Update):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await self._handle(update)
+        except Exception as e:
+            logger.exception("Ошибка при обработке обновления %s: %s", update.get('update_id'), e)
+
+    def _done(self, key: int, task: asyncio.Task):
+        self._slots.release()
+        self._tasks.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def join(self):
+        """Ожидает завершения всех принятых обновлений."""
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+
+def worker_main(index: int, queue, run_background: bool):
+    """Точка входа процесса-воркера."""
+    # Остановкой управляет супервизор (через сигнальное значение в очереди)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging(log_file=_worker_log_file(index))
+    asyncio.run(_run_worker(index, queue, run_background))
+
+
+def _worker_log_file(index: int) -> str:
+    """Отдельный файл журнала на воркер: ротация одного файла из нескольких процессов небезопасна."""
+    if not Config.LOG_FILE:
+        return ""
+    root, ext = os.path.splitext(Config.LOG_FILE)
+    return f"{root}.worker{index}{ext}"
+
+
+async def _run_worker(index: int, queue, run_background: bool):
+    bot = create_bot()
+    dp = create_dispatcher(run_background=run_background)
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    runner = KeyedTaskRunner(
+        lambda update: dp.feed_raw_update(bot, update),
+        max_in_flight=Config.WORKER_MAX_IN_FLIGHT,
+    )
+    # У каждого воркера свои метрики — и свой порт: METRICS_PORT + номер воркера
+    metrics_runner = None
+    if Config.METRICS_PORT:
+        metrics_runner = await start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT + index)
+
+    loop = asyncio.get_running_loop()
+    logger.info("Воркер %s запущен.", index)
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, queue.get)
+            if batch is None:
+                break
+            for update in batch:
+                await runner.submit(shard_key(update), update)
+        await runner.join()
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await close_db()
+        logger.info("Воркер %s остановлен.", index)
+
+
+class WorkerPool:
+    """
+    Процессы-воркеры с привязкой пользователей: обновление уходит воркеру shard_key % N.
+
+    Обновления передаются пачками через multiprocessing-очереди; упавший воркер
+    перезапускается и продолжает разбирать свою очередь. Фоновые задачи
+    (рассылки, пересчёт статистики, очистка FSM) выполняет только воркер 0.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue() for _ in range(workers)]
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=worker_main,
+            args=(index, self._queues[index], index == 0),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info("Запущено воркеров: %s.", self.workers)
+
+    def dispatch(self, updates: List[Update]):
+        """Распределяет обновления по воркерам, сохраняя порядок внутри каждого из них."""
+        batches: List[List[Update]] = [[] for _ in range(self.workers)]
+        for update in updates:
+            batches[shard_key(update) % self.workers].append(update)
+        for queue, batch in zip(self._queues, batches):
+            if batch:
+                queue.put(batch)
+
+    async def watch(self, interval: float = 1.0):
+        """Перезапускает завершившиеся воркеры."""
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logger.error("Воркер %s завершился с кодом %s, перезапуск.", index, process.exitcode)
+                    self._spawn(index)
+
+    async def stop(self, timeout: float = 30):
+        """Просит воркеры доработать принятые обновления и дожидается их завершения."""
+        for queue in self._queues:
+            queue.put(None)
+        loop = asyncio.get_running_loop()
+        for index, process in enumerate(self._processes):
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning("Воркер %s не остановился за %s с, завершаем принудительно.", index, timeout)
+                process.terminate()
+
+
+async def poll_updates(bot: Bot, pool: WorkerPool, allowed_updates: List[str], timeout: int = 30):
+    """
+    Long polling в супервизоре: getUpdates без разбора в объекты aiogram,
+    сырые обновления сразу отдаются воркерам.
+    """
+    url = bot.session.api.api_url(token=bot.token, method="getUpdates")
+    http = get_http_session()
+    request_timeout = aiohttp.ClientTimeout(total=timeout + 10)
+    offset = None
+    logger.info("Запуск polling в супервизоре.")
+    while True:
+        payload = {"timeout": timeout, "allowed_updates": allowed_updates}
+        if offset is not None:
+            payload["offset"] = offset
+        try:
+            async with http.post(url, json=payload, timeout=request_timeout) as response:
+                body = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Ошибка getUpdates: %s", e)
+            await asyncio.sleep(1)
+            continue
+
+        if not body.get("ok"):
+            logger.error("getUpdates вернул ошибку: %s", body.get('description'))
+            await asyncio.sleep((body.get("parameters") or {}).get("retry_after", 5))
+            continue
+
+        updates = body["result"]
+        if updates:
+            offset = updates[-1]["update_id"] + 1
+            pool.dispatch(updates)
+
+
+def create_webhook_app(pool: WorkerPool) -> web.Application:
+    """aiohttp-приложение супервизора: проверяет секрет и передаёт обновление воркеру."""
+    secret = Config.WEBHOOK_SECRET
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret):
+            return web.Response(status=401, text="Unauthorized")
+        pool.dispatch([await request.json()])
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(Config.WEBHOOK_PATH, handle)
+    return app
+
+
+async def run_supervisor(bot: Bot, mode: str, workers: int):
+    """Режим супервизора: получает обновления (polling или webhook) и распределяет их по воркерам."""
+    # Диспетчер в супервизоре нужен только для списка используемых типов обновлений
+    allowed_updates = create_dispatcher(run_background=False).resolve_used_update_types()
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+
+    pool = WorkerPool(workers)
+    pool.start()
+    watch_task = asyncio.create_task(pool.watch())
+    runner = None
+    try:
+        if mode == "webhook":
+            runner = web.AppRunner(create_webhook_app(pool))
+            await runner.setup()
+            await web.TCPSite(runner, host=Config.WEBAPP_HOST, port=Config.WEBAPP_PORT).start()
+            logger.info("Webhook-сервер супервизора запущен на %s:%s%s", Config.WEBAPP_HOST, Config.WEBAPP_PORT, Config.WEBHOOK_PATH)
+            await set_webhook(bot, allowed_updates)
+            await asyncio.Event().wait()
+        else:
+            await bot.delete_webhook()
+            await poll_updates(bot, pool, allowed_updates)
+    finally:
+        watch_task.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        await pool.stop()
+        await close_http_session()
@@ -0,0 +1,13 @@
+import asyncio
+from app.database.db import create_db_and_tables, get_async_session
+from app.database.crud import rebuild_daily_signups
+
+async def main():
+    await create_db_and_tables()
+    session = await get_async_session()
+    async with session:
+        await rebuild_daily_signups(session)
+    print("Сводка регистраций daily_signups пересчитана!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+# benchmarks/bench_broadcast.py
+"""
+Нагрузочный прогон рассылки.
+
+В таблицу users добавляются N синтетических получателей, затем рассылка выполняется
+настоящим run_broadcast_job (пачки получателей, контрольные точки, BroadcastEngine)
+против локального FakeBotAPI, который отвечает со случайной задержкой, возвращает
+429 с retry_after и 403 «bot was blocked» для части пользователей.
+
+Отчёт: доставлено в секунду, общее время, повторы после 429, заблокировавшие бота,
+итоги журнала доставки (broadcast_deliveries),
+пиковая память Python (tracemalloc) и оценка времени для кампании --campaign получателей.
+
+Пример:
+    python benchmarks/bench_broadcast.py --users 5000 --blocked 0.05 --retry-after-rate 0.002
+    python benchmarks/bench_broadcast.py --users 2000 --rate-limit 1000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # пути к ресурсам в Config относительные
+
+from benchmarks.fake_bot_api import FakeBotAPI  # noqa: E402
+
+FIRST_USER_ID = 3_000_000
+ADMIN_ID = 1
+SEED_BATCH = 1000
+
+
+async def seed_users(count: int, client_type: str):
+    """Добавляет синтетических получателей пачками (один INSERT на пачку)."""
+    from sqlalchemy import insert
+    from app.database.db import get_async_session
+    from app.database.models import User
+
+    session = await get_async_session()
+    async with session:
+        for offset in range(0, count, SEED_BATCH):
+            rows = [
+                {"id": FIRST_USER_ID + i, "name": f"Получатель {i}", "username": f"bcast{i}", "client_type": client_type}
+                for i in range(offset, min(offset + SEED_BATCH, count))
+            ]
+            await session.execute(insert(User), rows)
+        await session.commit()
+
+
+async def run(args):
+    from config import Config
+    from app.database.crud import create_broadcast_job, get_broadcast_delivery_summary, get_broadcast_job
+    from app.database.db import close_db, create_db_and_tables, get_async_session
+    from app.main import create_bot
+    from app.services.newsletter import run_broadcast_job
+
+    api = FakeBotAPI(
+        latency=args.latency / 1000,
+        latency_jitter=args.jitter / 1000,
+        retry_after_rate=args.retry_after_rate,
+        retry_after=args.retry_after,
+        blocked_rate=args.blocked,
+        seed=args.seed,
+    )
+    await api.start()
+    Config.TELEGRAM_API_URL = api.url
+    if args.rate_limit:
+        Config.BROADCAST_RATE_LIMIT = args.rate_limit
+    if args.concurrency:
+        Config.BROADCAST_CONCURRENCY = args.concurrency
+
+    await create_db_and_tables()
+    seed_started = time.perf_counter()
+    await seed_users(args.users, args.client_type)
+    print(f"Добавлено получателей: {args.users} за {time.perf_counter() - seed_started:.2f} с")
+
+    session = await get_async_session()
+    async with session:
+        job = await create_broadcast_job(args.client_type, ADMIN_ID, 1, ADMIN_ID, session)
+    expected_blocked = sum(api.is_blocked(FIRST_USER_ID + i) for i in range(args.users))
+
+    bot = create_bot()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        await run_broadcast_job(bot, job.id)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        await bot.session.close()
+
+    session = await get_async_session()
+    async with session:
+        job = await get_broadcast_job(job.id, session)
+        deliveries = await get_broadcast_delivery_summary(job.id, session)
+    await close_db()
+    await api.stop()
+
+    rate = job.sent_count / elapsed if elapsed else 0
+    attempts = job.sent_count + job.failed_count + api.injected["retry_after"]
+    print(f"Скорость рассылки: лимит {Config.BROADCAST_RATE_LIMIT}/с, параллельно {Config.BROADCAST_CONCURRENCY}")
+    print(f"Общее время:           {elapsed:.2f} с")
+    print(f"Доставлено:            {job.sent_count} ({rate:.1f} в секунду)")
+    print(f"Ошибок:                {job.failed_count} (заблокировали бота: {api.injected['blocked']}, ожидалось {expected_blocked})")
+    print(f"Повторов после 429:    {api.injected['retry_after']}")
+    print("Журнал доставки:       " + ", ".join(
+        f"{status}{f' ({error})' if error else ''}: {count}" for status, error, count in deliveries
+    ))
+    print(f"Запросов к API:        {attempts} ({attempts / elapsed:.1f} в секунду)")
+    print(f"Пиковая память Python: {peak / 1024 / 1024:.1f} МБ (tracemalloc), "
+          f"RSS процесса: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} МБ")
+    if args.campaign and elapsed:
+        projected = args.campaign / args.users * elapsed
+        print(f"Оценка для {args.campaign} получателей: {projected / 60:.1f} мин")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон рассылки против фейкового Bot API")
+    parser.add_argument("--users", type=int, default=2000, help="Синтетических получателей")
+    parser.add_argument("--client-type", default="individual")
+    parser.add_argument("--blocked", type=float, default=0.05, help="Доля пользователей, заблокировавших бота")
+    parser.add_argument("--retry-after-rate", type=float, default=0.002, help="Доля отправок, получающих 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответе 429, с")
+    parser.add_argument("--latency", type=float, default=30, help="Минимальная задержка ответа API, мс")
+    parser.add_argument("--jitter", type=float, default=40, help="Случайная добавка к задержке, до N мс")
+    parser.add_argument("--rate-limit", type=float, default=None, help="BROADCAST_RATE_LIMIT (по умолчанию из конфигурации)")
+    parser.add_argument("--concurrency", type=int, default=None, help="BROADCAST_CONCURRENCY (по умолчанию из конфигурации)")
+    parser.add_argument("--campaign", type=int, default=50_000, help="Размер кампании для оценки времени")
+    parser.add_argument("--database-url", default=None, help="По умолчанию — новый временный SQLite-файл")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_broadcast_"), "bench.db")
+        database_url = f"sqlite+aiosqlite:///{path}"
+    # Config читает окружение при импорте; база из .env для бенчмарка не используется
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+    logging.disable(logging.WARNING)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# benchmarks/bench_updates.py
+"""
+Сквозной бенчмарк обработки обновлений.
+
+Бот работает как в продакшене — polling через настоящий Dispatcher с роутерами
+из app/handlers, — но Bot API заменён локальным FakeBotAPI, а база — временным
+SQLite-файлом (или базой из --database-url, например локальным MySQL).
+Синтетический поток обновлений кладётся в очередь getUpdates; задержка обновления —
+от появления в очереди до завершения его обработки диспетчером.
+
+Сценарии:
+    start   — шквал /start от новых пользователей (регистрация в базе);
+    menu    — нажатия кнопок меню (правила, как добраться, ссылки);
+    weather — нажатия «Узнать погоду» (сервис погоды тоже имитируется);
+    mixed   — 40% start, 50% menu, 10% weather.
+
+SQLite выполняет записи по одной (движок открывает файл одним соединением в режиме WAL).
+Для цифр, сравнимых с продакшеном, используйте локальный MySQL через --database-url.
+
+Обновление считается неудачным, если при его обработке записана ошибка в журнал (обработчики
+бота сами перехватывают ошибки базы и отвечают пользователю) или исключение дошло до
+диспетчера. Прогон с неудачными обновлениями помечается недействительным, код выхода — 1.
+
+Результаты можно сохранить (--save) и сравнить с сохранённым ранее прогоном (--baseline).
+
+Пример:
+    python benchmarks/bench_updates.py --scenario mixed --updates 5000 --save baseline.json
+    python benchmarks/bench_updates.py --scenario mixed --updates 5000 --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # пути к ресурсам в Config относительные
+
+from benchmarks.fake_bot_api import FakeBotAPI  # noqa: E402
+
+MENU_CALLBACKS = ("rules", "directions", "maps", "website", "social_networks", "announcements", "video")
+SCENARIOS = ("start", "menu", "weather", "mixed")
+FIRST_USER_ID = 2_000_000
+
+# Обновление, которое сейчас обрабатывается в этой задаче (для привязки ошибок из журнала)
+current_update: contextvars.ContextVar = contextvars.ContextVar("current_update", default=None)
+
+
+class FailedUpdates(logging.Handler):
+    """Собирает ID обновлений, при обработке которых в журнал записана ошибка."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.update_ids = set()
+
+    def emit(self, record):
+        update_id = current_update.get()
+        if update_id is not None:
+            self.update_ids.add(update_id)
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"bench{user_id}"}
+
+
+def make_start(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+def make_callback(update_id: int, user_id: int, data: str) -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "Меню",
+            },
+            "chat_instance": str(user_id),
+            "data": data,
+        },
+    }
+
+
+def make_stream(scenario: str, count: int, users: int, seed: int) -> List[dict]:
+    """Синтетический поток обновлений; update_id начинаются с 1."""
+    rng = random.Random(seed)
+    stream = []
+    for update_id in range(1, count + 1):
+        kind = scenario
+        if scenario == "mixed":
+            kind = rng.choices(("start", "menu", "weather"), weights=(4, 5, 1))[0]
+        if kind == "start":
+            # Каждый /start — новый пользователь
+            stream.append(make_start(update_id, FIRST_USER_ID + users + update_id))
+        elif kind == "menu":
+            stream.append(make_callback(update_id, FIRST_USER_ID + rng.randrange(users), rng.choice(MENU_CALLBACKS)))
+        else:
+            stream.append(make_callback(update_id, FIRST_USER_ID + rng.randrange(users), "weather"))
+    return stream
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args) -> Dict[str, float]:
+    from aiogram import BaseMiddleware
+    from config import Config
+    from app.database.db import close_db, create_db_and_tables
+    from app.main import create_bot, create_dispatcher
+
+    api = FakeBotAPI(latency=args.api_latency / 1000)
+    await api.start()
+    Config.TELEGRAM_API_URL = api.url
+    Config.WEATHER_API_URL = f"{api.url}/weather"
+
+    await create_db_and_tables()
+
+    stream = make_stream(args.scenario, args.updates, args.users, args.seed)
+    finished_at: Dict[int, float] = {}
+    all_done = asyncio.Event()
+    failed = FailedUpdates()
+    logging.getLogger().addHandler(failed)
+
+    class CompletionMiddleware(BaseMiddleware):
+        """Отмечает момент, когда диспетчер закончил обработку обновления, и её исключения."""
+
+        async def __call__(self, handler, event, data):
+            current_update.set(event.update_id)
+            try:
+                return await handler(event, data)
+            except Exception:
+                failed.update_ids.add(event.update_id)
+                raise
+            finally:
+                finished_at[event.update_id] = time.perf_counter()
+                if len(finished_at) == len(stream):
+                    all_done.set()
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    dp.update.outer_middleware(CompletionMiddleware())
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=True))
+
+    try:
+        started = time.perf_counter()
+        if args.rate:
+            # Открытая нагрузка: обновления поступают с заданной частотой независимо от скорости бота
+            interval = 1 / args.rate
+            for index, update in enumerate(stream):
+                delay = started + index * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                api.push_update(update)
+        else:
+            for update in stream:
+                api.push_update(update)
+        await asyncio.wait_for(all_done.wait(), args.timeout)
+        elapsed = time.perf_counter() - started
+    finally:
+        await dp.stop_polling()
+        await polling
+        await close_db()
+        await api.stop()
+        logging.getLogger().removeHandler(failed)
+
+    latencies = [finished_at[update_id] - api.enqueued_at[update_id] for update_id in finished_at]
+    return {
+        "scenario": args.scenario,
+        "updates": len(stream),
+        "failed": len(failed.update_ids),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(stream) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "api_calls": sum(count for method, count in api.calls.items() if method != "getUpdates"),
+    }
+
+
+def report(result: Dict[str, float], baseline: Dict[str, float] = None):
+    print(f"Сценарий: {result['scenario']}, обновлений: {result['updates']}, время: {result['seconds']} с")
+    print(f"Вызовов Bot API: {result['api_calls']}")
+    print(f"Неудачных обновлений: {result['failed']}")
+    if result["failed"]:
+        print("ПРОГОН НЕДЕЙСТВИТЕЛЕН: часть обновлений завершилась ошибкой, цифры ниже не отражают "
+              "нормальную обработку (подробности — с --verbose).")
+    for key, label, higher_is_better in (
+        ("updates_per_second", "обновл./с", True),
+        ("p50_ms", "p50, мс", False),
+        ("p95_ms", "p95, мс", False),
+        ("p99_ms", "p99, мс", False),
+    ):
+        line = f"  {label:<10} {result[key]:>10}"
+        if baseline and baseline.get(key) and not baseline.get("failed"):
+            change = (result[key] - baseline[key]) / baseline[key] * 100
+            better = change > 0 if higher_is_better else change < 0
+            line += f"   (база {baseline[key]}, {change:+.1f}%{' лучше' if better else ''})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк обработки обновлений")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--updates", type=int, default=2000, help="Размер потока обновлений")
+    parser.add_argument("--users", type=int, default=500, help="Пользователей, нажимающих кнопки")
+    parser.add_argument("--rate", type=float, default=0, help="Обновлений в секунду (0 — весь поток сразу)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа фейкового API, мс")
+    parser.add_argument("--database-url", default=None, help="По умолчанию — новый временный SQLite-файл")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=600, help="Предельное время прогона, с")
+    parser.add_argument("--save", help="Сохранить результат в JSON")
+    parser.add_argument("--baseline", help="Сравнить с результатом из JSON")
+    parser.add_argument("--verbose", action="store_true", help="Не отключать логи уровня INFO")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_updates_"), "bench.db")
+        database_url = f"sqlite+aiosqlite:///{path}"
+    # Config читает окружение при импорте; база из .env для бенчмарка не используется
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+    if args.verbose:
+        from app.utils.logging_config import setup_logging
+        setup_logging(log_file="")
+    else:
+        logging.disable(logging.INFO)
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    report(result, baseline)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+    if result["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_workers.py
+"""
+Масштабирование обработки обновлений по числу процессов-воркеров.
+
+Для каждого значения --workers запускается WorkerPool (как в режиме WORKERS>1),
+через него прогоняются синтетические нажатия кнопок меню от --users пользователей,
+ответы принимает локальный FakeBotAPI. Обновление считается обработанным, когда бот
+вызвал answerCallbackQuery. База — временный SQLite-файл (или DATABASE_URL).
+
+Логи уровня INFO отключены, чтобы измерять обработку, а не вывод в консоль.
+
+Пример:
+    python benchmarks/bench_workers.py --workers 1,2,4 --updates 5000 --users 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # пути к ресурсам в Config относительные
+
+# Переменные окружения читаются Config при импорте — и в этом процессе, и в воркерах
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'bench_workers.db')}")
+logging.disable(logging.INFO)
+
+from benchmarks.fake_bot_api import FakeBotAPI  # noqa: E402
+
+CALLBACKS = ("rules", "directions", "maps", "website", "social_networks")
+
+
+def make_callback(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "Меню",
+            },
+            "chat_instance": str(user_id),
+            "data": CALLBACKS[update_id % len(CALLBACKS)],
+        },
+    }
+
+
+async def run_once(workers: int, updates: int, users: int, latency: float) -> float:
+    from app.workers import WorkerPool
+
+    api = FakeBotAPI(latency=latency)
+    await api.start()
+    os.environ["TELEGRAM_API_URL"] = api.url  # наследуется воркерами
+
+    pool = WorkerPool(workers)
+    pool.start()
+    try:
+        # Прогрев: по одному обновлению на каждого пользователя, чтобы воркеры
+        # запустились и заполнили кэши
+        warmup = [make_callback(i, 1_000_000 + i) for i in range(users)]
+        pool.dispatch(warmup)
+        await api.wait_for("answerCallbackQuery", len(warmup))
+
+        stream = [make_callback(len(warmup) + i, 1_000_000 + i % users) for i in range(updates)]
+        started = time.perf_counter()
+        for offset in range(0, updates, 100):  # getUpdates отдаёт до 100 обновлений
+            pool.dispatch(stream[offset:offset + 100])
+            await asyncio.sleep(0)
+        await api.wait_for("answerCallbackQuery", len(warmup) + updates)
+        return time.perf_counter() - started
+    finally:
+        await pool.stop()
+        await api.stop()
+
+
+async def main(args):
+    from app.database.db import close_db, create_db_and_tables
+
+    await create_db_and_tables()
+    await close_db()
+
+    baseline = None
+    print(f"{'воркеры':>8} {'время, с':>10} {'обновл./с':>12} {'ускорение':>10}")
+    for workers in args.workers:
+        elapsed = await run_once(workers, args.updates, args.users, args.api_latency / 1000)
+        rate = args.updates / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>10.2f} {rate:>12.1f} {rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк масштабирования по процессам-воркерам")
+    parser.add_argument("--workers", type=lambda s: [int(x) for x in s.split(",")], default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=3000, help="Обновлений в замеряемом потоке")
+    parser.add_argument("--users", type=int, default=500, help="Число разных пользователей")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа фейкового API, мс")
+    asyncio.run(main(parser.parse_args()))
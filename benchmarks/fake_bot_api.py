@@ -0,0 +1,183 @@
+# benchmarks/fake_bot_api.py
+"""
+Локальная замена Telegram Bot API для бенчмарков.
+
+Отвечает на методы, которые вызывает бот (getUpdates, getMe, sendMessage, sendDocument,
+copyMessage, answerCallbackQuery, setMyCommands и т.п.), считает вызовы по методам
+и может добавлять задержку ответа. Бот направляется сюда через TELEGRAM_API_URL.
+getUpdates отдаёт обновления, добавленные через push_update(); GET /weather
+имитирует сервис погоды (Config.WEATHER_API_URL).
+
+Для методов отправки можно включить сбои: 429 с retry_after (доля запросов
+`retry_after_rate`), 403 «bot was blocked by the user» (постоянно для доли чатов
+`blocked_rate`) и случайную задержку до `latency_jitter` секунд.
+"""
+
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from aiohttp import web
+
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "sendPhoto", "editMessageText"}
+SEND_METHODS = {"sendMessage", "sendDocument", "sendPhoto", "copyMessage"}
+
+
+class FakeBotAPI:
+    """aiohttp-сервер, имитирующий Bot API; `latency` — задержка каждого ответа (сек.)."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        retry_after_rate: float = 0.0,
+        retry_after: int = 1,
+        blocked_rate: float = 0.0,
+        seed: int = None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.blocked_rate = blocked_rate
+        self._rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        # Отданные ошибки: "retry_after", "blocked"
+        self.injected: Counter = Counter()
+        self._message_ids = itertools.count(1)
+        self._waiters: Dict[str, list] = {}
+        self._updates: List[dict] = []
+        self._updates_ready = asyncio.Event()
+        # update_id -> время, когда обновление стало доступно боту (time.perf_counter)
+        self.enqueued_at: Dict[int, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        app.router.add_get("/weather", self._weather)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # При port=0 порт выбирает система
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def push_update(self, update: dict):
+        """Добавляет обновление в очередь getUpdates."""
+        self.enqueued_at[update["update_id"]] = time.perf_counter()
+        self._updates.append(update)
+        self._updates_ready.set()
+
+    async def _get_updates(self, params) -> List[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            # Подтверждённые ботом обновления больше не отдаются
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    async def _weather(self, request: web.Request) -> web.Response:
+        self.calls["weather"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"current_weather": {"temperature": 21.5, "windspeed": 7.2, "weathercode": 1}})
+
+    async def wait_for(self, method: str, count: int):
+        """Ожидает, пока метод `method` будет вызван не меньше `count` раз."""
+        if self.calls[method] >= count:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(method, []).append((count, future))
+        await future
+
+    def _notify(self, method: str):
+        waiters = self._waiters.get(method)
+        if not waiters:
+            return
+        done = [(count, future) for count, future in waiters if self.calls[method] >= count]
+        for item in done:
+            waiters.remove(item)
+            if not item[1].done():
+                item[1].set_result(None)
+
+    def result(self, method: str, params) -> object:
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake bot", "username": "fake_bot"}
+        if method in MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id", 0))
+            message = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+            if method == "sendDocument":
+                message["document"] = {"file_id": f"fake-file-{message['message_id']}", "file_unique_id": "fake"}
+            return message
+        if method == "copyMessage":
+            return {"message_id": next(self._message_ids)}
+        return True
+
+    def is_blocked(self, chat_id: int) -> bool:
+        """Заблокировал ли пользователь бота (одинаково для всех запросов к этому чату)."""
+        return bool(self.blocked_rate) and random.Random(chat_id).random() < self.blocked_rate
+
+    def _injected_error(self, method: str, params) -> Optional[web.Response]:
+        if method not in SEND_METHODS:
+            return None
+        if self.is_blocked(int(params.get("chat_id", 0))):
+            self.injected["blocked"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"},
+                status=403,
+            )
+        if self.retry_after_rate and self._rng.random() < self.retry_after_rate:
+            self.injected["retry_after"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+        return None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        if method == "getUpdates":
+            self.calls[method] += 1
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        delay = self.latency + (self._rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        error = self._injected_error(method, params)
+        if error is not None:
+            return error
+        self.calls[method] += 1
+        self._notify(method)
+        return web.json_response({"ok": True, "result": self.result(method, params)})
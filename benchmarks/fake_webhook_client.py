@@ -0,0 +1,76 @@
+# benchmarks/fake_webhook_client.py
+"""
+Имитация Telegram для проверки webhook-режима локально.
+
+Отправляет синтетические обновления (/start, нажатия кнопок меню) POST-запросами
+на адрес webhook с заголовком X-Telegram-Bot-Api-Secret-Token и выводит коды ответов
+и скорость приёма. Бот запускается с BOT_MODE=webhook и пустым WEBHOOK_BASE_URL
+(тогда setWebhook в Telegram не вызывается).
+
+Пример:
+    python benchmarks/fake_webhook_client.py --url http://127.0.0.1:8080/webhook --secret s3cr3t --count 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+import aiohttp
+
+CALLBACKS = ("rules", "directions", "weather", "maps", "website", "social_networks")
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    """Чётные обновления — /start, нечётные — нажатие кнопки меню."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"}
+    chat = {"id": user_id, "type": "private", "first_name": user["first_name"]}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user}
+
+    if update_id % 2 == 0:
+        message.update(text="/start", entities=[{"type": "bot_command", "offset": 0, "length": 6}])
+        return {"update_id": update_id, "message": message}
+
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "message": dict(message, text="Меню"),
+            "chat_instance": str(user_id),
+            "data": CALLBACKS[update_id % len(CALLBACKS)],
+        },
+    }
+
+
+async def main(args):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    statuses = Counter()
+    update_ids = itertools.count(1)
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def worker(sent: int):
+            for update_id in itertools.islice(update_ids, sent):
+                user_id = args.first_user_id + update_id % args.users
+                async with session.post(args.url, json=make_update(update_id, user_id)) as response:
+                    statuses[response.status] += 1
+
+        per_worker, extra = divmod(args.count, args.concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(per_worker + (i < extra)) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"Отправлено обновлений: {args.count} за {elapsed:.2f} с ({args.count / elapsed:.1f}/с)")
+    for status, count in sorted(statuses.items()):
+        print(f"  HTTP {status}: {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фейковый клиент Telegram для webhook-режима")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default="", help="Значение WEBHOOK_SECRET")
+    parser.add_argument("--count", type=int, default=100, help="Сколько обновлений отправить")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных запросов")
+    parser.add_argument("--users", type=int, default=50, help="Число разных пользователей")
+    parser.add_argument("--first-user-id", type=int, default=10_000_000)
+    asyncio.run(main(parser.parse_args()))
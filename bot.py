@@ -1,88 +1,179 @@
 #основной файл
+#
+# Тяжёлые модули (aiogram, SQLAlchemy, обработчики, webhook-сервер, воркеры) импортируются
+# в функциях, где они нужны: импорт этого файла ничего не подключает и не выполняет
+# ввода-вывода, а процессы-воркеры (spawn) повторно импортируют его без лишних затрат.
 import asyncio
+import importlib
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.client.bot import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
-from config import load_config, validate_config
-from app.database.db import close_db, create_db_and_tables
-from app.handlers import (
-    common_router,
-    client_router,
-    admin_router,
-    support_router,
-    commands_router,
-    broadcast_router
-)
-from app.keyboards.set_commands import set_bot_commands
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
+from typing import TYPE_CHECKING
+from config import Config, load_config, validate_config
+from app.utils.logging_config import setup_logging
+from app.utils.timing import StartupTimer
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
 
 logger = logging.getLogger(__name__)
 
-print("Загрузка файла bot.py")
+
+async def on_webhook_startup(bot: "Bot", dispatcher: "Dispatcher"):
+    from app.main import set_webhook
+
+    await set_webhook(bot, dispatcher.resolve_used_update_types())
+
+
+async def run_polling(bot: "Bot", dp: "Dispatcher"):
+    """Long polling: обновления обрабатываются параллельно отдельными задачами."""
+    from app.services.metrics import start_metrics_server
+
+    # getUpdates не работает, пока у бота установлен webhook
+    await bot.delete_webhook()
+    metrics_runner = None
+    if Config.METRICS_PORT:
+        metrics_runner = await start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
+    logger.info("Запуск polling для бота.")
+    try:
+        await dp.start_polling(bot, handle_as_tasks=True)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+async def run_webhook(bot: "Bot", dp: "Dispatcher"):
+    """
+    Webhook: встроенный aiohttp-сервер принимает обновления на WEBHOOK_PATH.
+
+    Запросы без верного заголовка X-Telegram-Bot-Api-Secret-Token отклоняются;
+    каждое обновление обрабатывается в фоне, ответ Telegram отдаётся сразу.
+    /metrics на этом (публичном) сервере нет — метрики отдаёт отдельный сервер на METRICS_PORT.
+    """
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+    from aiohttp import web
+    from app.services.metrics import start_metrics_server
+
+    if not Config.WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET не задан — входящие запросы не проверяются.")
+
+    dp.startup.register(on_webhook_startup)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=Config.WEBHOOK_SECRET or None,
+    ).register(app, path=Config.WEBHOOK_PATH)
+    # Запуск и остановка aiohttp вызывают обработчики startup/shutdown диспетчера
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    metrics_runner = None
+    try:
+        site = web.TCPSite(runner, host=Config.WEBAPP_HOST, port=Config.WEBAPP_PORT)
+        await site.start()
+        logger.info("Webhook-сервер запущен на %s:%s%s", Config.WEBAPP_HOST, Config.WEBAPP_PORT, Config.WEBHOOK_PATH)
+        if Config.METRICS_PORT:
+            metrics_runner = await start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
+        await asyncio.Event().wait()
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await runner.cleanup()
+
+
+async def init_database(config) -> None:
+    """Создаёт недостающие таблицы (DB_AUTO_CREATE) или только проверяет соединение."""
+    from app.database.db import create_db_and_tables, ping_db
+
+    if config.DB_AUTO_CREATE:
+        await create_db_and_tables()
+    else:
+        await ping_db()
+
+
+async def init_bot(timer: StartupTimer):
+    """Импортирует бота с роутерами (в отдельном потоке) и проверяет токен через getMe."""
+    app_main = await timer.run("импорт", asyncio.to_thread(importlib.import_module, "app.main"))
+    bot = app_main.create_bot()
+    try:
+        bot_user = await timer.run("getMe", bot.get_me())
+    except BaseException:
+        await bot.session.close()
+        raise
+    return bot, bot_user
+
+
+async def close_database():
+    from app.database.db import close_db
+
+    await close_db()
+
 
 # Основная функция
 async def main():
+    timer = StartupTimer()
+    setup_logging()
     try:
         # Проверка и загрузка конфигурации
-        validate_config()
-        logger.info("Конфигурация успешно проверена.")
-        config = load_config()
-        logger.info("Конфигурация загружена успешно.")
-        logger.info(f"Длина токена: {len(config.BOT_TOKEN) if config.BOT_TOKEN else 'Токен отсутствует'}")
+        with timer.phase("конфигурация"):
+            validate_config()
+            config = load_config()
+        logger.info("Конфигурация проверена и загружена.")
+        logger.info("Длина токена: %s", len(config.BOT_TOKEN) if config.BOT_TOKEN else 'Токен отсутствует')
 
         if not config.BOT_TOKEN or not isinstance(config.BOT_TOKEN, str) or len(config.BOT_TOKEN.split(":")) != 2:
             logger.error("Ошибка: Токен бота не загружен или имеет неверный формат.")
             exit(1)
 
-        # Инициализация базы данных
-        logger.info("Инициализация базы данных.")
-        await create_db_and_tables()
-        logger.info("База данных и таблицы успешно созданы.")
-
-        # Инициализация бота
-        bot = Bot(
-            token=config.BOT_TOKEN,
-            default=DefaultBotProperties(parse_mode="HTML")
-        )
-        bot_user = await bot.get_me()
-        logger.info(f"Бот успешно авторизован. Информация о боте: {bot_user}")
-
-        # Инициализация диспетчера
-        dp = Dispatcher(storage=MemoryStorage())
-
-        # Подключение роутеров
-        dp.include_router(common_router)
-        dp.include_router(client_router)
-        dp.include_router(admin_router)
-        dp.include_router(support_router)
-        dp.include_router(commands_router)
-        dp.include_router(broadcast_router)
-
-        # Установка команд меню
-        await set_bot_commands(bot)
+        if config.BOT_MODE not in ("polling", "webhook"):
+            logger.error("Ошибка: неизвестный режим BOT_MODE=%r (ожидается polling или webhook).", config.BOT_MODE)
+            exit(1)
+
+        # База данных и бот инициализируются одновременно: пока идут запросы к базе,
+        # в потоке импортируются aiogram и обработчики, затем выполняется getMe
+        db_init = asyncio.create_task(timer.run("база данных", init_database(config)))
+        try:
+            bot, bot_user = await init_bot(timer)
+        except BaseException:
+            db_init.cancel()
+            raise
+        try:
+            await db_init
+        except BaseException:
+            await bot.session.close()
+            raise
+        logger.info("Бот успешно авторизован. Информация о боте: %s", bot_user)
+        logger.info("Инициализация за %s", timer.summary())
 
         # Запуск бота
         try:
-            logger.info("Запуск polling для бота.")
-            await dp.start_polling(bot)
+            if config.WORKERS > 1:
+                # Супервизор распределяет обновления по процессам-воркерам
+                from app.workers import run_supervisor
+
+                await run_supervisor(bot, config.BOT_MODE, config.WORKERS)
+            else:
+                # Диспетчер с роутерами, middleware и общими обработчиками запуска/остановки
+                from app.main import create_dispatcher
+
+                dp = create_dispatcher()
+                if config.BOT_MODE == "webhook":
+                    await run_webhook(bot, dp)
+                else:
+                    await run_polling(bot, dp)
         except Exception as e:
-            logger.error(f"Ошибка при запуске polling: {e}")
+            logger.error("Ошибка при работе бота (%s): %s", config.BOT_MODE, e)
         finally:
             logger.info("Остановка бота. Закрытие соединений.")
             await bot.session.close()
-            await close_db()
+            await close_database()
             logger.info("Сессия бота и подключение к базе данных закрыты.")
 
     except Exception as e:
-        logger.error(f"Фатальная ошибка: {e}")
-        await close_db()
+        logger.error("Фатальная ошибка: %s", e)
+        await close_database()
         exit(1)
 
 if __name__ == "__main__":
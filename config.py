@@ -17,6 +17,50 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN", "").strip()
     DATABASE_URL = os.getenv("DATABASE_URL", None)
 
+    # Отдельный HTTP-сервер метрик Prometheus (/metrics) во всех режимах; порт 0 — не запускать.
+    # Воркеры слушают METRICS_PORT + номер воркера. Публичный webhook-сервер /metrics не отдаёт,
+    # поэтому по умолчанию сервер метрик доступен только с localhost.
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+    # Логирование: уровень, формат записей ("kv" — ключ=значение, "json"),
+    # файл с ротацией (пусто — только консоль; каталог logs/ не отслеживается git),
+    # размер файла (байт) и число архивов
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "kv").strip().lower()
+    LOG_FILE = os.getenv("LOG_FILE", "logs/bot.log").strip()
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+
+    # Пул соединений с базой данных (для SQLite не применяется): размер, сверх лимита,
+    # время жизни соединения (сек., меньше wait_timeout MySQL), проверка перед выдачей, ожидание (сек.)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").strip().lower() in ("1", "true", "yes")
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Логирование каждого SQL-запроса (только для отладки)
+    DB_ECHO = os.getenv("DB_ECHO", "false").strip().lower() in ("1", "true", "yes")
+    # Создание недостающих таблиц и индексов при запуске. Если схема уже развёрнута
+    # (init_db.py), можно отключить: запуск ограничится проверкой соединения.
+    DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "true").strip().lower() in ("1", "true", "yes")
+
+    # Режим получения обновлений: "polling" или "webhook"
+    BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+    # Параметры webhook: публичный адрес, путь, секрет и адрес встроенного aiohttp-сервера
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "").strip().rstrip("/")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "").strip()
+    WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+    WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+    # Адрес локального Bot API сервера (пусто — api.telegram.org)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").strip().rstrip("/")
+
+    # Число процессов-воркеров (больше 1 — режим супервизора с привязкой пользователей к воркерам)
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    # Сколько обновлений воркер обрабатывает одновременно
+    WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", "100"))
+
     # Пути к ресурсам (относительно корня проекта)
     STAFF_USERNAMES_FILE = "resources/staff_usernames.txt"
     DIRECTIONS_FILE = "resources/directions.txt"
@@ -26,6 +70,40 @@ class Config:
     # Список ID администраторов (если используете этот подход)
     ADMIN_IDS: List[int] = list(map(int, os.getenv("ADMIN_IDS", "").split(','))) if os.getenv("ADMIN_IDS") else []
 
+    # Параметры рассылки (лимиты Bot API: ~30 сообщений в секунду на бота)
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+    BROADCAST_RATE_LIMIT = float(os.getenv("BROADCAST_RATE_LIMIT", "25"))
+    BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+    # Через сколько получателей сохранять курсор рассылки в базе
+    BROADCAST_CHECKPOINT_EVERY = int(os.getenv("BROADCAST_CHECKPOINT_EVERY", "200"))
+    # Аренда задания рассылки (сек.): задание выполняет один экземпляр бота, аренда продлевается
+    # на каждой контрольной точке. После остановки владельца задание подхватывает другой экземпляр.
+    BROADCAST_LEASE_SECONDS = int(os.getenv("BROADCAST_LEASE_SECONDS", "300"))
+    # Имя экземпляра бота в аренде рассылок (по умолчанию — хост и PID)
+    INSTANCE_ID = os.getenv("INSTANCE_ID", "").strip()
+    # Фоновые задачи обслуживания (пересчёт сводки регистраций, очистка FSM и журнала доставки).
+    # При нескольких экземплярах бота (реплики webhook) достаточно включить их на одном.
+    RUN_BACKGROUND_TASKS = os.getenv("RUN_BACKGROUND_TASKS", "true").strip().lower() in ("1", "true", "yes")
+    # Сколько дней хранить журнал доставки завершённых рассылок; 0 — хранить бессрочно
+    BROADCAST_DELIVERY_RETENTION_DAYS = int(os.getenv("BROADCAST_DELIVERY_RETENTION_DAYS", "30"))
+
+    # Кэш пользователей для middleware: размер и время жизни записи (сек.)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+    # Хранилище FSM: "sql" (в базе данных) или "memory"; кэш состояний и срок хранения (сек.)
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "sql").strip().lower()
+    FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+    # Кэш состояний в памяти процесса верен, только если апдейты пользователя всегда обрабатывает
+    # один процесс: polling или супервизор с воркерами. В webhook-режиме с одним процессом
+    # (реплики за балансировщиком) по умолчанию кэш выключен; 0 — выключить явно.
+    FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL") or (300 if BOT_MODE == "polling" or WORKERS > 1 else 0))
+    FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(7 * 24 * 60 * 60)))
+
+    # Фоновый пересчёт сводки регистраций: интервал (сек.) и глубина (дней)
+    SIGNUPS_COMPACTION_INTERVAL = int(os.getenv("SIGNUPS_COMPACTION_INTERVAL", "600"))
+    SIGNUPS_COMPACTION_DAYS = int(os.getenv("SIGNUPS_COMPACTION_DAYS", "2"))
+
     # Тексты приветственных сообщений
     WELCOME_MESSAGE = (
         "🌿 Добро пожаловать! Я — бот клиентской поддержки центра Narayana в Сочи. "
@@ -36,6 +114,13 @@ class Config:
 
     # Параметры для работы с погодным API
     WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast?latitude=43.5855&longitude=39.7202&current_weather=true"
+    # Время жизни закэшированной погоды и таймаут запроса (сек.)
+    WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "5"))
+
+    # Общий HTTP-клиент: лимит соединений и таймаут по умолчанию (сек.)
+    HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", "100"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
 
     # Словарь перевода описаний погоды
     WEATHER_CODES = {
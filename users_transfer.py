@@ -0,0 +1,160 @@
+"""
+Выгрузка и загрузка пользователей (таблица users) для переноса между окружениями.
+
+    python users_transfer.py export users.csv
+    python users_transfer.py export users.jsonl --batch-size 5000
+    python users_transfer.py import users.csv
+    python users_transfer.py import users.jsonl --skip-existing
+
+Формат определяется по расширению файла (.csv или .jsonl) либо задаётся --format.
+Выгрузка читает таблицу через серверный курсор, загрузка пишет многострочными
+INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT) по --batch-size строк с коммитом
+на пачку — память не зависит от размера таблицы. Прогресс загрузки считает
+обработанные строки файла; в итоге выводится, сколько пользователей добавлено
+(с --skip-existing остальные строки пропущены). После загрузки сводка
+регистраций daily_signups пересчитывается.
+"""
+
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from app.database.db import close_db, create_db_and_tables, get_async_session
+from app.database.crud import (
+    USER_TRANSFER_COLUMNS,
+    bulk_upsert_users,
+    count_users,
+    rebuild_daily_signups,
+    stream_users,
+)
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path: str, explicit: str = None) -> str:
+    if explicit:
+        return explicit
+    for fmt in FORMATS:
+        if path.lower().endswith(f".{fmt}"):
+            return fmt
+    raise SystemExit(f"Не удалось определить формат файла {path}: укажите --format ({' или '.join(FORMATS)}).")
+
+
+def report_progress(action: str, count: int, started: float, final: bool = False):
+    """Строка прогресса в stderr (перезаписывается на месте)."""
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0
+    print(f"\r{action}: {count} ({rate:.0f} в секунду, {elapsed:.1f} с)", end="\n" if final else "",
+          file=sys.stderr, flush=True)
+
+
+def _row_to_record(row) -> dict:
+    record = dict(row._mapping)
+    record["date_joined"] = record["date_joined"].isoformat() if record["date_joined"] else None
+    return record
+
+
+def _record_to_values(record: dict, line: int) -> dict:
+    """Строка файла -> значения для INSERT; пустые строки CSV считаются NULL."""
+    try:
+        user_id = int(record["id"])
+    except (KeyError, TypeError, ValueError):
+        raise SystemExit(f"Строка {line}: неверный или отсутствующий id: {record.get('id')!r}")
+    client_type = record.get("client_type")
+    if not client_type:
+        raise SystemExit(f"Строка {line}: не указан client_type для пользователя {user_id}")
+    date_joined = record.get("date_joined")
+    try:
+        date_joined = datetime.fromisoformat(date_joined) if date_joined else datetime.utcnow()
+    except (TypeError, ValueError):
+        raise SystemExit(f"Строка {line}: неверная дата регистрации пользователя {user_id}: {date_joined!r}")
+    return {
+        "id": user_id,
+        "name": record.get("name") or None,
+        "username": record.get("username") or None,
+        "client_type": client_type,
+        "date_joined": date_joined,
+    }
+
+
+def read_records(file, fmt: str):
+    """Построчно читает записи из файла (без загрузки файла целиком)."""
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+async def export_users(path: str, fmt: str, batch_size: int):
+    started = time.perf_counter()
+    count = 0
+    session = await get_async_session()
+    async with session:
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=USER_TRANSFER_COLUMNS) if fmt == "csv" else None
+            if writer:
+                writer.writeheader()
+            async for rows in stream_users(session, batch_size):
+                records = [_row_to_record(row) for row in rows]
+                if writer:
+                    writer.writerows(records)
+                else:
+                    file.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                count += len(records)
+                report_progress("Выгружено", count, started)
+    report_progress("Выгружено", count, started, final=True)
+
+
+async def import_users(path: str, fmt: str, batch_size: int, overwrite: bool):
+    await create_db_and_tables()
+    started = time.perf_counter()
+    count = 0
+    session = await get_async_session()
+    async with session:
+        users_before = await count_users(session)
+        with open(path, encoding="utf-8", newline="") as file:
+            batch = []
+            for line, record in enumerate(read_records(file, fmt), start=1):
+                batch.append(_record_to_values(record, line))
+                if len(batch) >= batch_size:
+                    count += await bulk_upsert_users(batch, session, overwrite)
+                    batch = []
+                    report_progress("Обработано", count, started)
+            if batch:
+                count += await bulk_upsert_users(batch, session, overwrite)
+        report_progress("Обработано", count, started, final=True)
+
+        added = await count_users(session) - users_before
+        existing = "обновлено" if overwrite else "пропущено"
+        print(f"Добавлено новых пользователей: {added}, {existing} существующих: {count - added}.", file=sys.stderr)
+
+        await rebuild_daily_signups(session)
+    print("Сводка регистраций daily_signups пересчитана.", file=sys.stderr)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Выгрузка и загрузка пользователей")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="Файл .csv или .jsonl")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="По умолчанию — по расширению файла")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Строк в одном запросе")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="При загрузке не изменять уже существующих пользователей")
+    args = parser.parse_args()
+
+    fmt = detect_format(args.path, args.format)
+    try:
+        if args.action == "export":
+            await export_users(args.path, fmt, args.batch_size)
+        else:
+            await import_users(args.path, fmt, args.batch_size, overwrite=not args.skip_existing)
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())